@@ -10,27 +10,37 @@ from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 
 from src.config import API_PREFIX, DEBUG
-from src.database import init_db
+from src.controllers.requests_controller import warmup_queries
+from src.database import engine, init_db, warm_pool
+from src.services import background_worker, callback_log_batcher, http_client
+from src.services.report_service import shutdown_report_pool
+from src.limiter import RemoteAddrMiddleware
+from src.logging_config import setup_logging, shutdown_logging
+from src.responses import ORJSONResponse
 from src.routes.health import router as health_router
 from src.routes.api_routes import router as api_router
 from src.routes.benchmark import router as benchmark_router
 from src.routes.webhook_test import router as webhook_router
 
 
-# Rate limiter - limits requests per IP address
-limiter = Limiter(key_func=get_remote_address)
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
+    """Start logging, initialize and warm up the database, start the callback log batcher and HTTP client, resume pending jobs; stop the worker, then drain/close on shutdown."""
+    setup_logging()
     await init_db()
+    await warm_pool(warmup_queries())
+    await callback_log_batcher.start()
+    await http_client.start()
+    await background_worker.recover_pending_jobs()
     yield
+    await background_worker.stop()  # first: running jobs/deliveries still use the client and batcher
+    await http_client.stop()
+    await callback_log_batcher.stop()
+    shutdown_report_pool()
+    await engine.dispose()  # close pooled connections cleanly (after the batcher's last flush)
+    shutdown_logging()  # last: flush whatever the steps above logged
 
 
 app = FastAPI(
@@ -38,12 +48,9 @@ app = FastAPI(
     description="Financial Report Generator - comparing sync (blocking) vs async (non-blocking) patterns",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # orjson instead of stdlib json
 )
 
-# Rate limiting: returns HTTP 429 when limit exceeded
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # CORS: allow React frontend (local + production)
 app.add_middleware(
     CORSMiddleware,
@@ -52,12 +59,17 @@ app.add_middleware(
         "http://localhost:3000",
         "https://reports-generator-client.vercel.app",  # Production client on Vercel
     ],
-    allow_origin_regex=r"https://.*\.(vercel\.app|up\.railway\.app)",  # Vercel & Railway deployments
+    # Vercel & Railway deployments (Starlette compiles this once at startup)
+    allow_origin_regex=r"https://[^/]+\.(vercel\.app|up\.railway\.app)",
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Resolve the client IP once per request for the rate limiter key
+# (added last = outermost, so it runs before CORS and every route)
+app.add_middleware(RemoteAddrMiddleware)
+
 # Register route modules
 app.include_router(health_router, prefix=API_PREFIX)
 app.include_router(api_router, prefix=API_PREFIX)
@@ -68,4 +80,13 @@ app.include_router(webhook_router, prefix=API_PREFIX)
 if __name__ == "__main__":
     import os
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run("src.app:app", host="0.0.0.0", port=port, reload=DEBUG)
+    uvicorn.run(
+        "src.app:app",
+        host="0.0.0.0",
+        port=port,
+        reload=DEBUG,
+        loop="uvloop",  # C event loop instead of asyncio's default
+        http="httptools",  # C HTTP parser instead of h11
+        # The FIFO queue lives in-process - keep 1 worker unless jobs move to a shared queue
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+    )
@@ -13,9 +13,43 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is required")
 
+# Connection pool - sockets are reused across requests
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+# Liveness check on every pool checkout - one extra round trip per session, but
+# needed where the server drops idle connections (Neon does when it suspends)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Set when connecting through a transaction-mode pooler (e.g. Neon's -pooler host)
+DB_TRANSACTION_POOLING = os.getenv("DB_TRANSACTION_POOLING", "false").lower() == "true"
+# Postgres synchronous_commit for the app's connections (unset = server default).
+# "off" acknowledges COMMIT before the WAL flush: cheaper commits, but a database
+# crash can lose the last moments of writes (no corruption)
+DB_SYNCHRONOUS_COMMIT = os.getenv("DB_SYNCHRONOUS_COMMIT")
+
+# Async job worker - reports processed at once. 1 keeps strict global FIFO;
+# above 1, ordering is kept per callback URL (see background_worker)
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", 1))
+
+# Report generation - processes in the report pool. 0 (default) runs reports on
+# threads, which suits the simulated (sleep-bound) work; set to the core count
+# when generation is really CPU-bound
+REPORT_PROCESSES = int(os.getenv("REPORT_PROCESSES", 0))
+
+# Artificial 10ms-per-transaction delay in report generation (what the
+# sync vs async benchmarks measure); set to false to generate at full speed
+SIMULATE_IO_DELAY = os.getenv("SIMULATE_IO_DELAY", "true").lower() == "true"
+
 # API
 API_PREFIX = "/api"
 
+# Rate limiting - Redis keeps one shared count across uvicorn workers/instances;
+# without REDIS_URL each process falls back to its own in-memory counters
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Report downloads - behind nginx, set to an `internal` location aliased to the
+# reports directory (e.g. /internal/reports/) and nginx sends the file itself
+REPORTS_ACCEL_REDIRECT = os.getenv("REPORTS_ACCEL_REDIRECT")
+
 # Server URL (for self-referencing callbacks in benchmark)
 if ENV == "production":
     SERVER_URL = os.getenv("SERVER_URL", "https://reports-generator-fastapi.up.railway.app")
@@ -9,18 +9,24 @@ Requests are added to a queue and processed in strict FIFO order.
 The queue_position field tracks the processing order.
 """
 
-import threading
 from typing import Optional
 
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from sqlalchemy import func, select
-from src.models import Request, STATUS_PENDING, CALLBACK_PENDING
-from src.services.background_worker import enqueue_job
+from src.controllers.requests_controller import find_by_idempotency_key
+from src.models import Request, STATUS_PENDING, CALLBACK_PENDING, queue_pos_seq
+from src.services.background_worker import enqueue_job, is_safe_callback_url
 
 
-async def handle_async_request(payload: dict, callback_url: str, db: AsyncSession, idempotency_key: Optional[str] = None) -> dict:
+async def handle_async_request(
+    payload: dict,
+    callback_url: str,
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = None,
+) -> dict:
     """
     Process report asynchronously (non-blocking).
 
@@ -30,9 +36,11 @@ async def handle_async_request(payload: dict, callback_url: str, db: AsyncSessio
     - queue_position shows exact processing order
 
     Steps:
+    0. Rejects an unsafe callback_url (SSRF check) with 400 - before any row
+       is written or report generated for a webhook that could never be sent
     1. Creates DB record with PENDING status
     2. Returns 202 IMMEDIATELY with request ID
-    3. Enqueues job in background (non-blocking)
+    3. Enqueues job as a background task (runs after the response is sent)
     4. Worker processes in order, calls webhook when complete
     """
     if not callback_url:
@@ -40,32 +48,55 @@ async def handle_async_request(payload: dict, callback_url: str, db: AsyncSessio
             status_code=400,
             detail="callback_url is required for async requests",
         )
+    if not is_safe_callback_url(callback_url):
+        raise HTTPException(
+            status_code=400,
+            detail="callback_url must be a public http(s) URL",
+        )
 
-    # Get next queue position (simple global increment)
-    result = await db.execute(select(func.max(Request.queue_position)))
-    queue_position = (result.scalar() or 0) + 1
-
-    # Create DB record with queue_position already set
-    request = Request(
-        mode="async",
-        status=STATUS_PENDING,
-        input_payload=payload,
-        callback_url=callback_url,
-        callback_status=CALLBACK_PENDING,
-        idempotency_key=idempotency_key,
-        queue_position=queue_position,
+    # Create DB record in one INSERT ... RETURNING round trip - queue_position
+    # comes from a Postgres sequence, so concurrent requests never share one.
+    # ON CONFLICT DO NOTHING folds the idempotency check into the same statement
+    result = await db.execute(
+        insert(Request)
+        .values(
+            mode="async",
+            status=STATUS_PENDING,
+            input_payload=payload,
+            callback_url=callback_url,
+            callback_status=CALLBACK_PENDING,
+            idempotency_key=idempotency_key,
+            queue_position=queue_pos_seq.next_value(),
+        )
+        .on_conflict_do_nothing(index_elements=[Request.idempotency_key])
+        .returning(Request.id, Request.queue_position)
     )
-    db.add(request)
+    row = result.one_or_none()
     await db.commit()
-    await db.refresh(request)
 
-    # Enqueue job in background thread - DON'T BLOCK THE RESPONSE
-    request_id = request.id
-    threading.Thread(target=enqueue_job, args=(request_id,), daemon=True).start()
+    if row is None:
+        # Duplicate (rare path) - point at the original request
+        existing = await find_by_idempotency_key(idempotency_key, db)
+        if existing is None:
+            # The original was deleted between our INSERT and this lookup
+            raise HTTPException(
+                status_code=409,
+                detail="Request with this idempotency key was just deleted, retry",
+            )
+        return {
+            "status": "duplicate",
+            "message": "Request with this idempotency key already exists",
+            "request_id": existing.id,
+        }
+    request_id, queue_position = row
+
+    # Enqueue job after the response is sent - DON'T BLOCK THE RESPONSE
+    # (position and callback URL passed along, so enqueueing needs no query)
+    background_tasks.add_task(enqueue_job, request_id, queue_position=queue_position, callback_url=callback_url)
 
     # Return 202 IMMEDIATELY with queue_position
     return {
-        "request_id": request.id,
+        "request_id": request_id,
         "queue_position": queue_position,
         "status": "pending",
         "message": f"Report generation queued (#{queue_position}). We will call you back at {callback_url}",
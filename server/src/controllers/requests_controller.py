@@ -2,59 +2,178 @@
 Requests Controller
 
 CRUD operations for viewing and managing report requests.
+
+CONDITIONAL GETS:
+Async clients poll GET /requests/{id} until the report is done. Every
+response carries an ETag, and If-None-Match gets a bodyless 304. Once a
+request is terminal (finished and callback settled) it can no longer change,
+so its serialized response is kept in a small in-process LRU and repeat polls
+skip loading and serializing the row. The LRU is per process, so a hit still
+runs a primary-key existence check - a delete on any worker is seen at once.
+Responses are "private, no-cache": clients may keep them, but must revalidate.
 """
 
+import base64
+import hashlib
+import uuid
+from collections import OrderedDict
+from datetime import datetime
 from typing import Literal, Optional
 
-from fastapi import HTTPException
-from sqlalchemy import select, delete
+import orjson
+from fastapi import HTTPException, Response
+from sqlalchemy import select, delete, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import Request
+from src.models import Request, STATUS_COMPLETED, STATUS_FAILED, CALLBACK_PENDING, report_file_id
+
+# Terminal request responses: {request_id: (etag, json_bytes)}, least recently used first
+TERMINAL_CACHE_SIZE = 10_000
+_terminal_cache: OrderedDict[uuid.UUID, tuple[str, bytes]] = OrderedDict()
+
+CACHE_CONTROL = "private, no-cache"  # revalidate with If-None-Match on every poll
+
+
+async def find_by_idempotency_key(idempotency_key: str, db: AsyncSession):
+    """Look up an earlier request by idempotency key - only the columns a duplicate response needs."""
+    result = await db.execute(
+        select(Request.id, Request.result_payload).where(Request.idempotency_key == idempotency_key)
+    )
+    return result.one_or_none()
+
+
+async def find_report_result(file_name: str, db: AsyncSession) -> Optional[dict]:
+    """Result payload of the completed request that produced a report file, if any."""
+    file_id = file_name.removesuffix(".csv").rpartition("_")[2]
+    results = await db.scalars(
+        select(Request.result_payload).where(report_file_id == file_id, Request.status == STATUS_COMPLETED)
+    )
+    # file_id is short - the full name must match too
+    return next((result for result in results if result.get("file_name") == file_name), None)
+
+
+def warmup_queries() -> list:
+    """The hot read queries, with placeholder values, for the startup pool warmup."""
+    return [
+        select(Request).where(Request.id == uuid.UUID(int=0)),
+        select(Request.id, Request.result_payload).where(Request.idempotency_key == ""),
+    ]
+
+
+def _encode_cursor(created_at: datetime, request_id: uuid.UUID) -> str:
+    """Opaque, URL-safe page cursor (base64url of "<created_at>|<id>") - no '+' to mangle."""
+    raw = f"{created_at.isoformat()}|{request_id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, request_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(request_id)
+    except ValueError:  # bad base64 / UTF-8 / shape / timestamp / uuid
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 async def get_requests(
     mode: Optional[Literal["sync", "async"]],
     db: AsyncSession,
+    limit: int = 50,
+    cursor: Optional[str] = None,
 ) -> dict:
-    """Get all requests, optionally filtered by mode."""
-    query = select(Request).order_by(Request.created_at.desc())
+    """
+    Get a page of requests (newest first), optionally filtered by mode.
+
+    Keyset pagination: pass the previous page's next_cursor to get older
+    rows. Memory stays bounded by the page size however large the table grows.
+    Rows are ordered by (created_at, id), so requests created in the same
+    instant are never skipped at a page boundary.
+    """
+    # Plain column select: no ORM objects, and the rows go straight to orjson
+    # (which formats the datetimes natively - no per-field isoformat() calls)
+    query = (
+        select(
+            Request.id,
+            Request.mode,
+            Request.status,
+            Request.callback_status,
+            Request.callback_attempts,
+            Request.idempotency_key,
+            Request.queue_position,  # FIFO order for async requests
+            Request.input_payload,
+            Request.result_payload,
+            Request.created_at,
+            Request.completed_at,
+        )
+        .order_by(Request.created_at.desc(), Request.id.desc())
+        .limit(limit)
+    )
 
     if mode:
         query = query.where(Request.mode == mode)
+    if cursor:
+        query = query.where(tuple_(Request.created_at, Request.id) < _decode_cursor(cursor))
 
     result = await db.execute(query)
-    requests = result.scalars().all()
+    requests = [dict(row) for row in result.mappings()]
 
     return {
-        "requests": [
-            {
-                "id": r.id,
-                "mode": r.mode,
-                "status": r.status,
-                "callback_status": r.callback_status,
-                "callback_attempts": r.callback_attempts,
-                "idempotency_key": r.idempotency_key,
-                "queue_position": r.queue_position,  # FIFO order for async requests
-                "input_payload": r.input_payload,
-                "result_payload": r.result_payload,
-                "created_at": r.created_at.isoformat(),
-                "completed_at": r.completed_at.isoformat() if r.completed_at else None,
-            }
-            for r in requests
-        ]
+        # Position of the last row, or None when this is the final page
+        "next_cursor": (
+            _encode_cursor(requests[-1]["created_at"], requests[-1]["id"]) if len(requests) == limit else None
+        ),
+        "requests": requests,
     }
 
 
-async def get_request_by_id(request_id: str, db: AsyncSession) -> dict:
-    """Get single request by ID with full details."""
+def _is_terminal(request: Request) -> bool:
+    """A request never changes again once it failed, or completed with its callback settled."""
+    if request.status == STATUS_FAILED:
+        return True
+    return request.status == STATUS_COMPLETED and request.callback_status != CALLBACK_PENDING
+
+
+def _etag(request: Request) -> str:
+    """Short hash over every field that changes during a request's lifetime."""
+    version = f"{request.id}:{request.status}:{request.callback_status}:{request.callback_attempts}:{request.completed_at}"
+    return '"' + hashlib.blake2b(version.encode(), digest_size=8).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check: "*", or any tag in the list (weak comparison, W/ ignored)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _conditional_response(etag: str, body: bytes, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def get_request_by_id(request_id: uuid.UUID, db: AsyncSession, if_none_match: Optional[str] = None) -> Response:
+    """Get single request by ID with full details (ETag / 304 aware)."""
+    cached = _terminal_cache.get(request_id)
+    if cached:
+        # Another worker may have deleted it - check by primary key before serving
+        if await db.scalar(select(Request.id).where(Request.id == request_id)) is None:
+            _terminal_cache.pop(request_id, None)
+            raise HTTPException(status_code=404, detail="Request not found")
+        _terminal_cache.move_to_end(request_id)
+        return _conditional_response(*cached, if_none_match)
+
     result = await db.execute(select(Request).where(Request.id == request_id))
     request = result.scalar_one_or_none()
 
     if not request:
         raise HTTPException(status_code=404, detail="Request not found")
 
-    return {
+    etag = _etag(request)
+    body = orjson.dumps({
         "id": request.id,
         "mode": request.mode,
         "status": request.status,
@@ -65,12 +184,20 @@ async def get_request_by_id(request_id: str, db: AsyncSession) -> dict:
         "callback_attempts": request.callback_attempts,
         "idempotency_key": request.idempotency_key,
         "queue_position": request.queue_position,  # FIFO order for async requests
-        "created_at": request.created_at.isoformat(),
-        "completed_at": request.completed_at.isoformat() if request.completed_at else None,
-    }
+        "created_at": request.created_at,
+        "completed_at": request.completed_at,
+    })
+
+    if not _is_terminal(request):
+        return _conditional_response(etag, body, if_none_match)
+
+    _terminal_cache[request_id] = (etag, body)
+    if len(_terminal_cache) > TERMINAL_CACHE_SIZE:
+        _terminal_cache.popitem(last=False)
+    return _conditional_response(etag, body, if_none_match)
 
 
-async def delete_request_by_id(request_id: str, db: AsyncSession) -> dict:
+async def delete_request_by_id(request_id: uuid.UUID, db: AsyncSession) -> dict:
     """Delete a single request by ID."""
     result = await db.execute(select(Request).where(Request.id == request_id))
     request = result.scalar_one_or_none()
@@ -80,6 +207,7 @@ async def delete_request_by_id(request_id: str, db: AsyncSession) -> dict:
 
     await db.delete(request)
     await db.commit()
+    _terminal_cache.pop(request_id, None)
 
     return {"deleted": True, "id": request_id}
 
@@ -88,5 +216,6 @@ async def delete_all_requests(db: AsyncSession) -> dict:
     """Delete all requests."""
     result = await db.execute(delete(Request))
     await db.commit()
+    _terminal_cache.clear()
 
     return {"deleted": True, "count": result.rowcount}
@@ -9,18 +9,23 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.controllers.requests_controller import find_by_idempotency_key
 from src.models import Request, STATUS_COMPLETED, STATUS_FAILED
-from src.services.report_service import generate_report
+from src.services.report_service import run_report
 
 
 async def handle_sync_request(payload: dict, db: AsyncSession, idempotency_key: Optional[str] = None) -> dict:
     """
     Process report synchronously (blocking).
 
-    - Creates DB record
-    - Generates report inline
+    - Validates input before any DB access
+    - Creates DB record (a repeated idempotency key returns the original instead)
+    - Generates report inline (off the event loop via run_report, so it keeps
+      serving other requests while this caller waits)
     - Returns result with download URL
 
     Limited to <100 transactions to prevent timeouts.
@@ -33,35 +38,56 @@ async def handle_sync_request(payload: dict, db: AsyncSession, idempotency_key:
             detail="Sync endpoint limited to < 100 transactions. Use /async for larger reports.",
         )
 
-    # Create DB record
-    request = Request(
-        mode="sync",
-        input_payload=payload,
-        idempotency_key=idempotency_key,
+    # Create DB record and check idempotency in one round trip:
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING gives no row for a duplicate
+    request_id = await db.scalar(
+        insert(Request)
+        .values(mode="sync", input_payload=payload, idempotency_key=idempotency_key)
+        .on_conflict_do_nothing(index_elements=[Request.idempotency_key])
+        .returning(Request.id)
     )
-    db.add(request)
     await db.commit()
-    await db.refresh(request)
+
+    if request_id is None:
+        # Duplicate (rare path) - fetch the original to return its result
+        existing = await find_by_idempotency_key(idempotency_key, db)
+        if existing is None:
+            # The original was deleted between our INSERT and this lookup
+            raise HTTPException(
+                status_code=409,
+                detail="Request with this idempotency key was just deleted, retry",
+            )
+        return {
+            "status": "duplicate",
+            "message": "Request with this idempotency key already exists",
+            "request_id": existing.id,
+            "original_result": existing.result_payload,
+        }
+
+    update_request = update(Request).where(Request.id == request_id)
 
     try:
-        # Execute work inline (blocking)
-        result = generate_report(payload)
+        # Execute work inline - the caller blocks, the event loop doesn't
+        result = await run_report(payload)
 
         # Update record
-        request.status = STATUS_COMPLETED
-        request.result_payload = result
-        request.completed_at = datetime.now(timezone.utc)
+        await db.execute(
+            update_request.values(
+                status=STATUS_COMPLETED,
+                result_payload=result,
+                completed_at=datetime.now(timezone.utc),
+            )
+        )
         await db.commit()
 
         return {
-            "request_id": request.id,
+            "request_id": request_id,
             "mode": "sync",
             "status": "completed",
             **result,  # flatten result into response
         }
 
     except Exception as e:
-        request.status = STATUS_FAILED
-        request.result_payload = {"error": str(e)}
+        await db.execute(update_request.values(status=STATUS_FAILED, result_payload={"error": str(e)}))
         await db.commit()
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,163 @@
+"""
+Rate Limiter
+
+Per-client-IP sliding-window limits, used as a FastAPI dependency:
+
+    @router.post("/sync", dependencies=[Depends(RateLimit(30))])
+
+With REDIS_URL set, every check is one atomic Lua script on Redis
+(ZREMRANGEBYSCORE old hits, ZCARD, ZADD the new one), awaited on the event
+loop - so the limit is global across uvicorn workers and instances instead
+of limit x N_workers. Without Redis (local dev), or if Redis is unreachable,
+each process keeps its own in-memory windows.
+
+Redis calls time out after REDIS_TIMEOUT, so a hung Redis can't stall
+/sync and /async. After a failure the limiter stays on the in-memory windows
+for REDIS_RETRY_AFTER seconds (circuit breaker), then lets one request
+probe Redis again - no reconnect attempt or log line per request.
+
+The client IP is resolved once per request by RemoteAddrMiddleware and
+stored on request.state, so every limit check reuses it.
+"""
+
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config import REDIS_URL
+
+log = logging.getLogger(__name__)
+
+# KEYS[1] = window key; ARGV = now_ms, window_ms, limit, unique member.
+# Returns 0 when the hit is allowed, otherwise the ms until the oldest hit expires.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) < tonumber(ARGV[3]) then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+    return 0
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+return math.max(tonumber(oldest[2]) + window - now, 1)
+"""
+
+# In-memory fallback: {key: deque of hit times (ms)}, least recently used first
+MEMORY_MAX_KEYS = 10_000
+_memory_windows: OrderedDict[str, deque[float]] = OrderedDict()
+
+_redis_script = None
+
+REDIS_TIMEOUT = 0.1  # seconds, connect and per command
+REDIS_RETRY_AFTER = 30  # seconds on the in-memory windows after a Redis failure
+# time.monotonic() before which Redis is skipped; 0 while it is healthy
+_redis_retry_at = 0.0
+
+
+class RemoteAddrMiddleware:
+    """Pure ASGI middleware that stores the client address on request.state."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            client = scope.get("client")
+            scope.setdefault("state", {})["remote_addr"] = client[0] if client else "127.0.0.1"
+        await self.app(scope, receive, send)
+
+
+def get_cached_remote_address(request: Request) -> str:
+    """Limiter key - reads the address resolved by RemoteAddrMiddleware."""
+    remote_addr = request.scope.get("state", {}).get("remote_addr")
+    if remote_addr:
+        return remote_addr
+    return request.client.host if request.client else "127.0.0.1"
+
+
+def _get_redis_script():
+    """Lazily connect to Redis and register the Lua script (None without REDIS_URL)."""
+    global _redis_script
+    if _redis_script is None and REDIS_URL:
+        import redis.asyncio as redis
+
+        client = redis.from_url(REDIS_URL, socket_connect_timeout=REDIS_TIMEOUT, socket_timeout=REDIS_TIMEOUT)
+        _redis_script = client.register_script(SLIDING_WINDOW_LUA)
+    return _redis_script
+
+
+def _hit_memory(key: str, now_ms: float, window_ms: int, limit: int) -> float:
+    """Same algorithm as the Lua script, for a single process."""
+    hits = _memory_windows.get(key)
+    if hits is None:
+        hits = _memory_windows[key] = deque()
+        if len(_memory_windows) > MEMORY_MAX_KEYS:
+            _memory_windows.popitem(last=False)
+    else:
+        _memory_windows.move_to_end(key)
+
+    while hits and hits[0] <= now_ms - window_ms:
+        hits.popleft()
+    if len(hits) < limit:
+        hits.append(now_ms)
+        return 0
+    return max(hits[0] + window_ms - now_ms, 1)
+
+
+async def _hit_redis(script, key: str, now_ms: float, window_ms: int, limit: int) -> Optional[float]:
+    """Run the Lua script - None while the breaker is open or when Redis fails."""
+    global _redis_retry_at
+    if time.monotonic() < _redis_retry_at:
+        return None
+    probing = _redis_retry_at > 0
+    if probing:
+        # Half-open: this request probes, the others stay in memory meanwhile
+        _redis_retry_at = time.monotonic() + REDIS_RETRY_AFTER
+
+    try:
+        retry_after_ms = await script(keys=[key], args=[now_ms, window_ms, limit, f"{now_ms}:{uuid.uuid4().hex[:8]}"])
+    except Exception as e:
+        if not _redis_retry_at:
+            log.warning("[Rate Limit] Redis unavailable, using in-memory windows for %ss: %s", REDIS_RETRY_AFTER, e)
+        _redis_retry_at = time.monotonic() + REDIS_RETRY_AFTER
+        return None
+
+    if probing:
+        log.info("[Rate Limit] Redis reachable again")
+    _redis_retry_at = 0.0
+    return retry_after_ms
+
+
+class RateLimit:
+    """FastAPI dependency enforcing `limit` requests per `window` seconds per client IP."""
+
+    def __init__(self, limit: int, window: int = 60):
+        self.limit = limit
+        self.window_ms = window * 1000
+        self.description = f"{limit} per {window} seconds"
+
+    async def __call__(self, request: Request):
+        key = f"ratelimit:{request.url.path}:{get_cached_remote_address(request)}"
+        now_ms = time.time() * 1000
+
+        retry_after_ms: Optional[float] = None
+        script = _get_redis_script()
+        if script is not None:
+            retry_after_ms = await _hit_redis(script, key, now_ms, self.window_ms, self.limit)
+        if retry_after_ms is None:
+            retry_after_ms = _hit_memory(key, now_ms, self.window_ms, self.limit)
+
+        if retry_after_ms:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded: {self.description}",
+                headers={"Retry-After": str(int(retry_after_ms // 1000) + 1)},
+            )
@@ -0,0 +1,48 @@
+"""
+Logging Setup - non-blocking logs for the app's own modules
+
+Every module logs through logging.getLogger(__name__) (the "src.*" tree).
+The "src" logger only has a QueueHandler: a log call on the event loop is a
+queue put, and a QueueListener thread does the formatting and the stdout
+write - so the worker never blocks on console I/O.
+- Started/stopped from the FastAPI lifespan (stop flushes queued records)
+- Uvicorn's own loggers are left alone
+"""
+
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+from src.config import DEBUG
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """Route the "src" logger through a queue drained by a background thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    app_logger = logging.getLogger("src")
+    app_logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+    app_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    app_logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, console)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Write out any queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
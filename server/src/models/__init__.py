@@ -10,5 +10,7 @@ from src.models.request_model import (
     CALLBACK_PENDING,
     CALLBACK_SUCCESS,
     CALLBACK_FAILED,
+    queue_pos_seq,
+    report_file_id,
 )
 from src.models.callback_log_model import CallbackLog
@@ -1,11 +1,11 @@
 """Callback attempt logs - tracks each retry attempt for debugging and analytics."""
 
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Integer, Text, ForeignKey, Index
-from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy import Integer, Text, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import TIMESTAMP, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.database import Base
@@ -16,20 +16,19 @@ class CallbackLog(Base):
 
     __tablename__ = "callback_logs"
 
-    id: Mapped[str] = mapped_column(
-        String(36), primary_key=True, default=lambda: str(uuid.uuid4())
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()")
     )
-    request_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("requests.id", ondelete="CASCADE"), nullable=False
+    request_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("requests.id", ondelete="CASCADE"), nullable=False
     )
     attempt_number: Mapped[int] = mapped_column(Integer, nullable=False)
     status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # HTTP status or null if connection failed
     success: Mapped[bool] = mapped_column(default=False)
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     response_time_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
-    attempted_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc)
-    )
+    # The batcher passes the real attempt time; Postgres stamps rows inserted without one
+    attempted_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
 
     __table_args__ = (
         Index("ix_callback_logs_request_id", "request_id"),
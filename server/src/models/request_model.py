@@ -6,11 +6,11 @@ Tracks status, results, callback delivery, and idempotency.
 """
 
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Literal, Optional
 
-from sqlalchemy import JSON, Index, String, Integer
-from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy import Index, Integer, Sequence, String, UniqueConstraint, func, literal_column, text
+from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.database import Base
@@ -31,32 +31,65 @@ CALLBACK_PENDING = "PENDING"
 CALLBACK_SUCCESS = "SUCCESS"
 CALLBACK_FAILED = "FAILED"
 
+# FIFO queue positions for async requests - assigned atomically by Postgres
+queue_pos_seq = Sequence("queue_pos_seq", metadata=Base.metadata)
+
 
 class Request(Base):
     """Tracks a report generation request."""
 
     __tablename__ = "requests"
 
-    id: Mapped[str] = mapped_column(
-        String(36), primary_key=True, default=lambda: str(uuid.uuid4())
+    # Native 16-byte uuid generated by Postgres (half the size of a String(36) key)
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()")
     )
     mode: Mapped[str] = mapped_column(String(10))
     status: Mapped[str] = mapped_column(String(20), default=STATUS_PENDING)
-    input_payload: Mapped[dict] = mapped_column(JSON)
-    result_payload: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # JSONB: stored parsed (no re-parse on read), TOAST-compressed, indexable
+    input_payload: Mapped[dict] = mapped_column(JSONB)
+    result_payload: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
     callback_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     callback_status: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
     callback_attempts: Mapped[int] = mapped_column(Integer, default=0)
-    idempotency_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, unique=True)
-    # FIFO Queue position - auto-incrementing for async requests to maintain order
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    # FIFO Queue position - drawn from queue_pos_seq for async requests to maintain order
     queue_position: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc)
-    )
+    # Stamped by Postgres - one less bound parameter per INSERT
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
     completed_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
 
     __table_args__ = (
         Index("ix_requests_status", "status"),
-        Index("ix_requests_idempotency_key", "idempotency_key"),
+        # Its B-tree also serves the dedup lookups (ON CONFLICT, find_by_idempotency_key)
+        UniqueConstraint("idempotency_key", name="uq_requests_idempotency_key"),
         Index("ix_requests_queue_position", "queue_position"),
+        # GET /requests (with or without ?mode=) reads rows already in
+        # (created_at, id) DESC order - id breaks ties for the page cursor
+        Index(
+            "ix_requests_created_at_id",
+            "created_at",
+            "id",
+            postgresql_ops={"created_at": "DESC", "id": "DESC"},
+        ),
+        Index(
+            "ix_requests_mode_created_at_id",
+            "mode",
+            "created_at",
+            "id",
+            postgresql_ops={"created_at": "DESC", "id": "DESC"},
+        ),
+        # In-flight async jobs (queue status, oldest-pending scans): partial, so it
+        # only holds the handful of unfinished rows, not the completed history
+        Index(
+            "ix_requests_async_active_created_at",
+            "created_at",
+            postgresql_where=text("mode = 'async' AND status IN ('PENDING', 'PROCESSING')"),
+        ),
     )
+
+
+# result_payload ->> 'file_id', with the key inlined rather than bound, so
+# report downloads (which look up their request by file id) can use the index
+report_file_id = Request.result_payload.op("->>", return_type=String)(literal_column("'file_id'"))
+Index("ix_requests_report_file_id", report_file_id)
@@ -0,0 +1,19 @@
+"""
+Default JSON Response
+
+Renders response bodies with orjson (Rust) instead of the stdlib json module.
+Registered as the app's default_response_class, so every dict an endpoint
+returns is serialized through it.
+"""
+
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse that serializes with orjson (datetimes as ISO 8601)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -4,42 +4,43 @@ Core API Routes
 Endpoints:
 - POST /sync  - Synchronous report generation (blocks until complete)
 - POST /async - Asynchronous report generation (returns immediately, webhook callback)
-- GET/DELETE /requests - Request management
+- GET/DELETE /requests - Request management (GET is cursor-paginated)
 - GET /reports/{file} - Download generated CSV files
 - GET /requests/{id}/callback-logs - View webhook delivery attempts
 """
 
+import gzip
 import os
+import uuid
 from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Header, Request
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from src.controllers.sync_controller import handle_sync_request
 from src.controllers.async_controller import handle_async_request
-from src.controllers.requests_controller import get_requests, get_request_by_id, delete_request_by_id, delete_all_requests
+from src.config import REPORTS_ACCEL_REDIRECT
+from src.controllers.requests_controller import get_requests, get_request_by_id, delete_request_by_id, delete_all_requests, find_report_result
 from src.database import get_db
-from src.models import CallbackLog, Request as RequestModel
+from src.limiter import RateLimit
+from src.models import CallbackLog
+from src.responses import ORJSONResponse
+from src.services.report_service import REPORTS_DIR, materialize_report
 
 router = APIRouter()
 
-# Rate limiter - tracks requests per IP
-limiter = Limiter(key_func=get_remote_address)
-
-# Directory where generated CSV reports are stored
-REPORTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "reports")
+# Resolved once: downloads must stay inside this directory
+REPORTS_ROOT = os.path.realpath(REPORTS_DIR)
 
 
 # --- Request Schemas ---
 
 class ReportPayload(BaseModel):
     """Input for report generation."""
-    num_transactions: int = 50
+    num_transactions: int = Field(50, ge=1)
     report_name: str = "Monthly_Report"
 
 
@@ -49,13 +50,11 @@ class AsyncRequestBody(BaseModel):
     callback_url: str
 
 
-@router.post("/sync")
-@limiter.limit("30/minute")
+@router.post("/sync", dependencies=[Depends(RateLimit(30))])
 async def sync_endpoint(
-    request: Request,  # Required by rate limiter to get client IP
     payload: ReportPayload,
     db: AsyncSession = Depends(get_db),
-    x_idempotency_key: Optional[str] = Header(None, alias="X-Idempotency-Key"),
+    x_idempotency_key: Optional[str] = Header(None, alias="X-Idempotency-Key", max_length=64),
 ):
     """
     Synchronous endpoint - blocks until report generation completes.
@@ -63,30 +62,15 @@ async def sync_endpoint(
     Rate limit: 30 requests/minute per IP
     Idempotency: Pass X-Idempotency-Key header to prevent duplicate processing
     """
-    # Check for existing request with same idempotency key
-    if x_idempotency_key:
-        result = await db.execute(
-            select(RequestModel).where(RequestModel.idempotency_key == x_idempotency_key)
-        )
-        existing = result.scalar_one_or_none()
-        if existing:
-            return {
-                "status": "duplicate",
-                "message": "Request with this idempotency key already exists",
-                "request_id": existing.id,
-                "original_result": existing.result_payload,
-            }
-
     return await handle_sync_request(payload.model_dump(), db, idempotency_key=x_idempotency_key)
 
 
-@router.post("/async", status_code=202)
-@limiter.limit("60/minute")
+@router.post("/async", status_code=202, dependencies=[Depends(RateLimit(60))])
 async def async_endpoint(
-    request: Request,  # Required by rate limiter to get client IP
     body: AsyncRequestBody,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    x_idempotency_key: Optional[str] = Header(None, alias="X-Idempotency-Key"),
+    x_idempotency_key: Optional[str] = Header(None, alias="X-Idempotency-Key", max_length=64),
 ):
     """
     Asynchronous endpoint - returns immediately with request ID.
@@ -95,23 +79,11 @@ async def async_endpoint(
     Rate limit: 60 requests/minute per IP
     Idempotency: Pass X-Idempotency-Key header to prevent duplicate processing
     """
-    # Check for existing request with same idempotency key
-    if x_idempotency_key:
-        result = await db.execute(
-            select(RequestModel).where(RequestModel.idempotency_key == x_idempotency_key)
-        )
-        existing = result.scalar_one_or_none()
-        if existing:
-            return {
-                "status": "duplicate",
-                "message": "Request with this idempotency key already exists",
-                "request_id": existing.id,
-            }
-
     return await handle_async_request(
         body.payload.model_dump(),
         body.callback_url,
         db,
+        background_tasks,
         idempotency_key=x_idempotency_key,
     )
 
@@ -119,24 +91,36 @@ async def async_endpoint(
 @router.get("/requests")
 async def list_requests(
     mode: Optional[Literal["sync", "async"]] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, max_length=128),
     db: AsyncSession = Depends(get_db),
 ):
-    """List recent requests, optionally filtered by mode."""
-    return await get_requests(mode, db)
+    """
+    List recent requests, optionally filtered by mode.
+
+    Paginated: pass the returned next_cursor as ?cursor= to fetch older requests.
+    """
+    # Already JSON-ready: hand it straight to orjson, skipping jsonable_encoder
+    return ORJSONResponse(await get_requests(mode, db, limit=limit, cursor=cursor))
 
 
 @router.get("/requests/{request_id}")
 async def get_request(
-    request_id: str,
+    request_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """Get a single request by ID."""
-    return await get_request_by_id(request_id, db)
+    """
+    Get a single request by ID.
+
+    Returns an ETag; send it back as If-None-Match to get 304 Not Modified while polling.
+    """
+    return await get_request_by_id(request_id, db, if_none_match)
 
 
 @router.delete("/requests/{request_id}")
 async def delete_request(
-    request_id: str,
+    request_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
 ):
     """Delete a single request by ID."""
@@ -152,45 +136,120 @@ async def delete_requests(
 
 
 @router.get("/reports/{file_name}")
-async def download_report(file_name: str):
-    """Download a generated report file."""
-    file_path = os.path.join(REPORTS_DIR, file_name)
+async def download_report(
+    file_name: str,
+    accept_encoding: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Download a generated report file.
+
+    The CSV is written on the first download (jobs only compute the summary),
+    from the stored result of the request that generated it.
 
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Report not found")
+    Reports are stored gzipped and sent as-is with Content-Encoding: gzip;
+    clients that don't accept gzip get it decompressed on the fly.
 
-    return FileResponse(
-        path=file_path,
-        filename=file_name,
+    With REPORTS_ACCEL_REDIRECT set, only the header is sent and nginx streams
+    the file with sendfile(2), so the bytes never pass through Python.
+    """
+    # Resolve symlinks/".." first, then make sure the result is still in REPORTS_ROOT
+    file_path = os.path.realpath(os.path.join(REPORTS_ROOT, file_name))
+    if os.path.dirname(file_path) != REPORTS_ROOT:
+        raise HTTPException(status_code=400, detail="Invalid report name")
+    name = os.path.basename(file_path)
+    gz_path = f"{file_path}.gz"
+
+    # One stat serves as the existence check and is reused by FileResponse
+    # (reports written before gzip storage are plain CSV)
+    try:
+        stat_result, gzipped = os.stat(gz_path), True
+    except FileNotFoundError:
+        try:
+            stat_result, gzipped = os.stat(file_path), False
+        except FileNotFoundError:
+            # Not downloaded before: write it now (the DB is only hit on this path)
+            result = await find_report_result(name, db)
+            if result is None or "generated_at" not in result:
+                raise HTTPException(status_code=404, detail="Report not found")
+            stat_result, gzipped = os.stat(await materialize_report(result)), True
+
+    if REPORTS_ACCEL_REDIRECT:
+        # nginx picks the .gz itself (gzip_static always; gunzip on;)
+        return Response(
+            media_type="text/csv",
+            headers={
+                "X-Accel-Redirect": f"{REPORTS_ACCEL_REDIRECT}{name}",
+                "Content-Disposition": f'attachment; filename="{name}"',
+            },
+        )
+
+    if not gzipped:
+        return FileResponse(path=file_path, filename=name, media_type="text/csv", stat_result=stat_result)
+
+    if _accepts_gzip(accept_encoding):
+        return FileResponse(
+            path=gz_path,
+            filename=name,
+            media_type="text/csv",
+            stat_result=stat_result,
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+
+    return StreamingResponse(
+        _gunzip_chunks(gz_path),
         media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{name}"', "Vary": "Accept-Encoding"},
     )
 
 
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Accept-Encoding allows gzip: listed (or x-gzip), else via "*", with q > 0."""
+    qualities = {}
+    for token in (accept_encoding or "").split(","):
+        coding, *params = (part.strip() for part in token.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.lower()] = q
+    q = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return q > 0
+
+
+def _gunzip_chunks(path: str, chunk_size: int = 64 * 1024):
+    """Decompress a stored report in chunks (iterated on Starlette's threadpool)."""
+    with gzip.open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
 @router.get("/requests/{request_id}/callback-logs")
 async def get_callback_logs(
-    request_id: str,
+    request_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
 ):
     """Get callback attempt logs for a request."""
     result = await db.execute(
-        select(CallbackLog)
+        select(
+            CallbackLog.attempt_number,
+            CallbackLog.status_code,
+            CallbackLog.success,
+            CallbackLog.error_message,
+            CallbackLog.response_time_ms,
+            CallbackLog.attempted_at,  # orjson formats datetimes natively
+        )
         .where(CallbackLog.request_id == request_id)
         .order_by(CallbackLog.attempt_number)
     )
-    logs = result.scalars().all()
+    logs = [dict(row) for row in result.mappings()]
 
-    return {
+    return ORJSONResponse({
         "request_id": request_id,
         "total_attempts": len(logs),
-        "logs": [
-            {
-                "attempt_number": log.attempt_number,
-                "status_code": log.status_code,
-                "success": log.success,
-                "error_message": log.error_message,
-                "response_time_ms": log.response_time_ms,
-                "attempted_at": log.attempted_at.isoformat() if log.attempted_at else None,
-            }
-            for log in logs
-        ],
-    }
+        "logs": logs,
+    })
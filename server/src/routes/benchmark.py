@@ -9,16 +9,18 @@ Runs load tests to compare sync vs async API performance.
 
 import asyncio
 import time
+import uuid
 
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks
 from pydantic import BaseModel
 from sqlalchemy import select
 
 from src.database import async_session
 from src.controllers.sync_controller import handle_sync_request
 from src.controllers.async_controller import handle_async_request
-from src.models import Request
+from src.models import Request, CALLBACK_SUCCESS
 from src.config import SERVER_URL
+from src.routes.webhook_test import pending_callbacks
 
 router = APIRouter()
 
@@ -50,12 +52,38 @@ class AsyncBenchmarkResult(BenchmarkResult):
     p95_callback_ms: float = 0
 
 
-def calculate_percentile(latencies: list[float], percentile: int) -> float:
+FALLBACK_POLL_INTERVAL = 1.0  # seconds
+
+
+async def _poll_callback_status(callback_events: dict[str, asyncio.Event]):
+    """
+    Fallback for callbacks delivered to another worker process (WEB_CONCURRENCY > 1),
+    whose receiver can't see this process's events: one IN (...) query per tick
+    for everything still outstanding, instead of a SELECT per request.
+    """
+    while True:
+        await asyncio.sleep(FALLBACK_POLL_INTERVAL)
+        outstanding = [uuid.UUID(req_id) for req_id, event in callback_events.items() if not event.is_set()]
+        if not outstanding:
+            return
+        async with async_session() as db:
+            result = await db.execute(
+                select(Request.id).where(
+                    Request.id.in_(outstanding),
+                    Request.callback_status == CALLBACK_SUCCESS,
+                )
+            )
+        for req_id in result.scalars():
+            callback_events[str(req_id)].set()
+
+
+def calculate_percentiles(latencies: list[float], *percentiles: int) -> list[float]:
+    """Nearest-rank percentiles from a single sort (one Timsort however many are asked for)."""
     if not latencies:
-        return 0
+        return [0] * len(percentiles)
     sorted_latencies = sorted(latencies)
-    index = int(len(sorted_latencies) * percentile / 100)
-    return sorted_latencies[min(index, len(sorted_latencies) - 1)]
+    last = len(sorted_latencies) - 1
+    return [sorted_latencies[min(int(len(sorted_latencies) * p / 100), last)] for p in percentiles]
 
 
 @router.post("/benchmark/sync")
@@ -79,6 +107,7 @@ async def benchmark_sync(config: BenchmarkConfig) -> BenchmarkResult:
             latencies.append((time.time() - start) * 1000)
 
     await asyncio.gather(*[run_single() for _ in range(config.concurrency)])
+    p50, p95, p99 = calculate_percentiles(latencies, 50, 95, 99)
 
     return BenchmarkResult(
         mode="sync",
@@ -88,9 +117,9 @@ async def benchmark_sync(config: BenchmarkConfig) -> BenchmarkResult:
         avg_latency_ms=sum(latencies) / len(latencies) if latencies else 0,
         min_latency_ms=min(latencies) if latencies else 0,
         max_latency_ms=max(latencies) if latencies else 0,
-        p50_ms=calculate_percentile(latencies, 50),
-        p95_ms=calculate_percentile(latencies, 95),
-        p99_ms=calculate_percentile(latencies, 99),
+        p50_ms=p50,
+        p95_ms=p95,
+        p99_ms=p99,
     )
 
 
@@ -101,20 +130,29 @@ async def benchmark_async(config: BenchmarkConfig, wait_for_callbacks: bool = Fa
     failed = 0
     request_ids = []
     request_start_times = {}
+    callback_events: dict[str, asyncio.Event] = {}
 
     async def run_single():
         nonlocal failed
         start = time.time()
         try:
+            background_tasks = BackgroundTasks()
             async with async_session() as db:
                 result = await handle_async_request(
                     {"num_transactions": config.num_transactions, "report_name": "benchmark"},
                     f"{SERVER_URL}/api/callbacks/receive",
                     db,
+                    background_tasks,
                 )
             ack_latencies.append((time.time() - start) * 1000)
             request_ids.append(result["request_id"])
             request_start_times[result["request_id"]] = start
+            if wait_for_callbacks:
+                # Register before the job is enqueued, so the callback can't beat us
+                event = callback_events[str(result["request_id"])] = asyncio.Event()
+                pending_callbacks[str(result["request_id"])] = event
+            # Enqueue after the ack, like FastAPI does once the response is sent
+            await background_tasks()
         except Exception:
             failed += 1
             ack_latencies.append((time.time() - start) * 1000)
@@ -127,25 +165,28 @@ async def benchmark_async(config: BenchmarkConfig, wait_for_callbacks: bool = Fa
 
     if wait_for_callbacks and request_ids:
         max_wait = 30  # seconds
-        poll_interval = 0.5
-        waited = 0
-        completed_ids = set()
 
-        while waited < max_wait and len(completed_ids) < len(request_ids):
-            await asyncio.sleep(poll_interval)
-            waited += poll_interval
+        # Event-driven: the webhook receiver sets each event as its callback
+        # arrives - no poll-interval bias in the timings. The batched poll only
+        # catches callbacks that landed on another worker process.
+        async def wait_for_callback(req_id):
+            await callback_events[str(req_id)].wait()
+            callback_latencies.append((time.time() - request_start_times[req_id]) * 1000)
 
-            async with async_session() as db:
-                for req_id in request_ids:
-                    if req_id in completed_ids:
-                        continue
-                    result = await db.execute(select(Request).where(Request.id == req_id))
-                    req = result.scalar_one_or_none()
-                    if req and req.callback_status == "SUCCESS":
-                        callback_time = (time.time() - request_start_times[req_id]) * 1000
-                        callback_latencies.append(callback_time)
-                        completed_ids.add(req_id)
-                        callbacks_received += 1
+        waiters = [asyncio.create_task(wait_for_callback(req_id)) for req_id in request_ids]
+        poller = asyncio.create_task(_poll_callback_status(callback_events))
+        _, still_waiting = await asyncio.wait(waiters, timeout=max_wait)
+        callbacks_received = len(callback_latencies)
+
+        # Callbacks that never arrived
+        poller.cancel()
+        for waiter in still_waiting:
+            waiter.cancel()
+        for req_id in callback_events:
+            pending_callbacks.pop(req_id, None)
+
+    p50, p95, p99 = calculate_percentiles(ack_latencies, 50, 95, 99)
+    p50_callback, p95_callback = calculate_percentiles(callback_latencies, 50, 95)
 
     return AsyncBenchmarkResult(
         mode="async",
@@ -155,13 +196,13 @@ async def benchmark_async(config: BenchmarkConfig, wait_for_callbacks: bool = Fa
         avg_latency_ms=sum(ack_latencies) / len(ack_latencies) if ack_latencies else 0,
         min_latency_ms=min(ack_latencies) if ack_latencies else 0,
         max_latency_ms=max(ack_latencies) if ack_latencies else 0,
-        p50_ms=calculate_percentile(ack_latencies, 50),
-        p95_ms=calculate_percentile(ack_latencies, 95),
-        p99_ms=calculate_percentile(ack_latencies, 99),
+        p50_ms=p50,
+        p95_ms=p95,
+        p99_ms=p99,
         callbacks_received=callbacks_received,
         avg_callback_ms=sum(callback_latencies) / len(callback_latencies) if callback_latencies else 0,
-        p50_callback_ms=calculate_percentile(callback_latencies, 50),
-        p95_callback_ms=calculate_percentile(callback_latencies, 95),
+        p50_callback_ms=p50_callback,
+        p95_callback_ms=p95_callback,
     )
 
 
@@ -1,13 +1,17 @@
-import os
 import platform
 from datetime import datetime, timezone
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+
+from src.config import ENV
 
 router = APIRouter()
 
 START_TIME = datetime.now(timezone.utc)
 
+# Production probe response: built once, no per-request dict or serialization
+HEALTHY_RESPONSE = Response(content=b'{"status":"healthy"}', media_type="application/json")
+
 
 @router.get("/health")
 async def health_check():
@@ -15,10 +19,8 @@ async def health_check():
     Health check endpoint.
     Returns minimal response in production, detailed info in development.
     """
-    is_prod = os.getenv("ENV") == "production"
-
-    if is_prod:
-        return {"status": "healthy"}
+    if ENV == "production":
+        return HEALTHY_RESPONSE
 
     uptime = datetime.now(timezone.utc) - START_TIME
 
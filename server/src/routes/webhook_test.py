@@ -5,13 +5,20 @@ In production, customers provide their own URL (e.g., https://customer.com/webho
 This endpoint simulates that for demo/testing purposes.
 """
 
+import asyncio
 import random
+from collections import deque
 from fastapi import APIRouter, Request, HTTPException
 
+from src.responses import ORJSONResponse
+
 router = APIRouter()
 
-# Store received callbacks for inspection
-received_callbacks: list[dict] = []
+# Store the last 100 received callbacks for inspection (oldest evicted on append)
+received_callbacks: deque[dict] = deque(maxlen=100)
+
+# Benchmark runs waiting for callbacks: {request_id: Event}, set when one is accepted
+pending_callbacks: dict[str, asyncio.Event] = {}
 
 # Simulate unreliable endpoint (for testing retry logic)
 failure_simulation = {"enabled": False, "failure_rate": 100}
@@ -26,25 +33,27 @@ async def receive_callback(request: Request):
     body = await request.json()
     received_callbacks.append(body)
 
-    # Keep only last 100 callbacks
-    if len(received_callbacks) > 100:
-        received_callbacks.pop(0)
-
     # Simulate unreliable endpoint (for retry testing)
     if failure_simulation["enabled"]:
         if random.randint(1, 100) <= failure_simulation["failure_rate"]:
             raise HTTPException(status_code=500, detail="Simulated server error")
 
+    # Wake a benchmark waiting on this request (accepted callbacks only, like callback_status=SUCCESS)
+    event = pending_callbacks.pop(body.get("request_id"), None)
+    if event:
+        event.set()
+
     return {"status": "received", "request_id": body.get("request_id")}
 
 
 @router.get("/callbacks/history")
 async def get_callback_history():
     """View received callbacks (for demo inspection)."""
-    return {
+    # Plain JSON already - straight to orjson, skipping jsonable_encoder
+    return ORJSONResponse({
         "total": len(received_callbacks),
         "callbacks": list(reversed(received_callbacks)),
-    }
+    })
 
 
 @router.delete("/callbacks/history")
@@ -1,2 +1,2 @@
-from src.services.report_service import generate_report
+from src.services.report_service import generate_report, run_report
 from src.services.background_worker import process_job_in_background
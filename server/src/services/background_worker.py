@@ -3,15 +3,32 @@ Background Worker for Async Report Processing - FIFO Queue Implementation
 
 ORDERING GUARANTEE:
 This worker implements strict FIFO (First-In-First-Out) ordering for async requests.
-Requests are processed in the exact order they were received, one at a time.
+With WORKER_CONCURRENCY=1 (default) requests are processed in the exact order
+they were received, one at a time. With WORKER_CONCURRENCY=N, up to N reports
+run at once and FIFO holds per callback URL - each receiver still gets its
+callbacks in submission order.
 
 Architecture:
-1. A thread-safe queue.Queue holds request IDs in FIFO order
-2. A single worker thread processes jobs sequentially from the queue
+1. Each lane (one, or one per callback URL) is a deque of request IDs in FIFO order
+2. One consumer task per lane processes its jobs sequentially, holding one of
+   the WORKER_CONCURRENCY slots (_WorkerSlots) while a job runs
 3. Each request gets a queue_position (auto-incrementing) to track order
-4. The worker starts automatically on first job submission
-
-Why single worker instead of thread-per-request?
+4. A lane's consumer starts on its first job and exits once the lane is empty
+
+Everything runs on the event loop with the app's async engine (asyncpg) and
+the shared, pooled httpx.AsyncClient (see http_client) - no extra OS thread
+or second (psycopg2) connection pool.
+Only the CPU-bound report generation leaves the loop (see run_report).
+
+Priority (internal only - not settable through the API):
+- Jobs resumed after a restart (recover_pending_jobs) have already waited,
+  so they are enqueued with priority=True
+- Lanes stay strictly FIFO: priority never reorders jobs for a receiver
+- It applies where lanes actually wait - the shared worker slots: a lane
+  whose next job is priority gets the next free slot, but at most
+  PRIORITY_BURST times in a row while normal lanes wait (no starvation)
+
+Why one worker per lane instead of task-per-request?
 - FIFO guarantee: Jobs complete in submission order
 - Predictable: No race conditions between concurrent jobs
 - Queue position shows exact processing order
@@ -20,228 +37,509 @@ Why single worker instead of thread-per-request?
 Retry Strategy for Callbacks:
 - Max 3 attempts with exponential backoff (2s, 4s, 8s)
 - Only 5xx errors trigger retries (4xx are not retried)
-- Each attempt is logged to callback_logs table
+- Each attempt is logged to callback_logs table (batched, see callback_log_batcher)
+- At most MAX_QUEUED_DELIVERIES per callback URL are queued with their payload;
+  beyond that only request IDs wait, and the payload is re-read when their turn comes
+- Callbacks cut off by a shutdown stay callback_status=PENDING in the database
+  and are re-sent by recover_pending_jobs() on the next start
 """
 
-import queue
-import threading
+import asyncio
+import logging
+import socket
 import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+from functools import lru_cache, partial
 from urllib.parse import urlparse
 import ipaddress
 from typing import Optional
 
-import httpx
-from sqlalchemy import create_engine, func
-from sqlalchemy.orm import sessionmaker
+import orjson
+from sqlalchemy import func, select, update
 
-from src.config import DATABASE_URL
+from src.config import WORKER_CONCURRENCY
+from src.database import async_session
 from src.models import (
     Request,
-    CallbackLog,
     STATUS_PENDING,
     STATUS_PROCESSING,
     STATUS_COMPLETED,
     STATUS_FAILED,
+    CALLBACK_PENDING,
     CALLBACK_SUCCESS,
     CALLBACK_FAILED,
+    queue_pos_seq,
 )
-from src.services.report_service import generate_report
+from src.services import callback_log_batcher
+from src.services.http_client import get_http
+from src.services.report_service import run_report
 
-# ============================================================================
-# DATABASE CONNECTION (Synchronous for background thread)
-# ============================================================================
-# FastAPI uses async (asyncpg), but the worker thread needs sync (psycopg2)
-sync_db_url = (
-    DATABASE_URL
-    .replace("+asyncpg", "+psycopg2")
-    .replace("+aiosqlite", "")
-    .replace("ssl=require", "sslmode=require")
-)
-engine = create_engine(sync_db_url)
-Session = sessionmaker(bind=engine)
+log = logging.getLogger(__name__)
 
 # ============================================================================
-# FIFO QUEUE & WORKER
+# FIFO LANES & WORKERS
 # ============================================================================
-# Thread-safe FIFO queue - jobs are processed in exact submission order
-_job_queue: queue.Queue[str] = queue.Queue()
-_worker_thread: Optional[threading.Thread] = None
-_worker_lock = threading.Lock()
+# A lane holds the jobs that must run in order relative to each other and is
+# drained by its own consumer task. With WORKER_CONCURRENCY=1 there is a single
+# lane (strict global FIFO); above that, each callback URL - i.e. each webhook
+# receiver/customer - gets its own lane, and up to WORKER_CONCURRENCY reports
+# run at once while every receiver still sees its callbacks in order.
+
+# Priority slot grants in a row while normal lanes are waiting
+PRIORITY_BURST = 4
 
 # Retry configuration for webhook callbacks
 MAX_RETRIES = 3
 RETRY_DELAYS = [2, 4, 8]  # Exponential backoff in seconds
+CALLBACK_HEADERS = {"Content-Type": "application/json"}
+# Deliveries queued (task + payload in memory) per callback URL; later ones park
+MAX_QUEUED_DELIVERIES = 100
 
 
-def _get_next_queue_position() -> int:
-    """
-    Get the next queue position for FIFO ordering.
-    Uses MAX(queue_position) + 1 to ensure strict ordering.
+class _WorkerSlots:
     """
-    session = Session()
-    try:
-        result = session.query(func.max(Request.queue_position)).scalar()
-        return (result or 0) + 1
-    finally:
-        session.close()
-
+    The WORKER_CONCURRENCY report slots shared by all lanes (a semaphore with
+    two wait queues).
 
-def _ensure_worker_running():
-    """
-    Start the FIFO worker thread if not already running.
-    Uses double-checked locking for thread safety.
+    Waiters are served in arrival order, priority waiters first - but only
+    PRIORITY_BURST grants in a row while normal waiters exist.
+    A released slot is handed straight to the chosen waiter.
     """
-    global _worker_thread
 
-    if _worker_thread is not None and _worker_thread.is_alive():
-        return
+    def __init__(self, size: int):
+        self._free = size
+        self._waiters: dict[bool, deque[asyncio.Future]] = {True: deque(), False: deque()}
+        self._priority_streak = 0
+
+    @asynccontextmanager
+    async def slot(self, priority: bool = False):
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
 
-    with _worker_lock:
-        # Double-check after acquiring lock
-        if _worker_thread is not None and _worker_thread.is_alive():
+    async def _acquire(self, priority: bool):
+        if self._free and not (self._waiters[True] or self._waiters[False]):
+            self._free -= 1
             return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # handed a slot just as we were cancelled: pass it on
+            else:
+                self._waiters[priority].remove(waiter)
+            raise
+
+    def _release(self):
+        priority, normal = self._waiters[True], self._waiters[False]
+        if priority and (not normal or self._priority_streak < PRIORITY_BURST):
+            self._priority_streak = self._priority_streak + 1 if normal else 0
+            priority.popleft().set_result(None)
+        elif normal:
+            self._priority_streak = 0
+            normal.popleft().set_result(None)
+        else:
+            self._free += 1
+
+    def waiting(self, priority: bool) -> int:
+        return len(self._waiters[priority])
+
+
+_worker_slots = _WorkerSlots(WORKER_CONCURRENCY)
+
+
+class _Lane:
+    """FIFO jobs for one ordering key (deque: O(1) append/popleft, no locks)."""
+
+    def __init__(self):
+        self.jobs: deque[tuple[uuid.UUID, bool]] = deque()  # (request_id, priority)
+        self.consumer: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+# Active lanes by ordering key; a lane is removed when its consumer drains it
+_lanes: dict[str, _Lane] = {}
+
+# Last scheduled delivery per callback URL - the tail of that receiver's chain
+_deliveries: dict[str, asyncio.Task] = {}
+# Every delivery still running (the chains' earlier links included), for stop()
+_delivery_tasks: set[asyncio.Task] = set()
+# Deliveries queued per callback URL, and the request IDs parked behind them
+# once a slow receiver's chain is full (payloads stay in the database)
+_queued_deliveries: dict[str, int] = {}
+_parked_deliveries: dict[str, deque[uuid.UUID]] = {}
 
-        _worker_thread = threading.Thread(target=_fifo_worker, daemon=True)
-        _worker_thread.start()
-        print("[FIFO Worker] Started background worker thread")
+# Set by stop(): no new jobs start; queued ones stay PENDING for the next start
+_stopping = False
+SHUTDOWN_GRACE = 10  # seconds running jobs / deliveries get to finish
 
 
-def _fifo_worker():
+def _lane_key(callback_url: Optional[str]) -> str:
+    return (callback_url or "") if WORKER_CONCURRENCY > 1 else ""
+
+
+async def _assign_queue_position(request_id: uuid.UUID) -> tuple[Optional[int], Optional[str]]:
     """
-    Single worker thread that processes jobs from the FIFO queue.
+    Fallback for jobs enqueued without their position (legacy callers).
+
+    One UPDATE ... RETURNING keeps an existing queue_position or draws the next
+    one from the same queue_pos_seq sequence as async_controller (COALESCE only
+    calls nextval when needed), and returns the callback URL for the lane.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            update(Request)
+            .where(Request.id == request_id)
+            .values(queue_position=func.coalesce(Request.queue_position, queue_pos_seq.next_value()))
+            .returning(Request.queue_position, Request.callback_url)
+        )
+        row = result.one_or_none()
+        await session.commit()
+    return (row.queue_position, row.callback_url) if row else (None, None)
+
+
+async def _lane_worker(key: str, lane: _Lane):
+    """
+    Consumer task for one lane.
 
     ORDERING LOGIC:
-    - queue.Queue.get() blocks until a job is available
     - Jobs are retrieved in FIFO order (first submitted = first processed)
-    - Only ONE job processes at a time, ensuring sequential completion
-    - Worker runs forever as a daemon thread
+    - Only ONE job per lane processes at a time, ensuring in-order completion
+    - A worker slot (WORKER_CONCURRENCY) is held while a report is generated
+    - Callbacks are handed off (see _schedule_delivery), so a slow or failing
+      receiver's retry backoff never holds up the queue
+    - The task exits and the lane is reaped once it is empty; no lock is
+      needed since everything here runs on the single event loop thread
+    - Before exiting it yields to the loop once, so enqueues already
+      scheduled (a burst of background tasks) reuse this consumer instead of
+      reaping the lane and starting a new one - no polling while idle
     """
-    print("[FIFO Worker] Worker thread ready, waiting for jobs...")
+    try:
+        while True:
+            while lane and not _stopping:
+                request_id, priority = lane.jobs.popleft()
+                try:
+                    async with _worker_slots.slot(priority):
+                        log.info("[FIFO Worker] Processing job: %.8s...", request_id)
+                        callback = await _process_job(request_id)
+                    log.info("[FIFO Worker] Completed job: %.8s", request_id)
+                    if callback:
+                        _schedule_delivery(*callback)
+                except Exception as e:
+                    log.error("[FIFO Worker] Error processing job: %s", e)
+
+            await asyncio.sleep(0)
+            if not lane or _stopping:
+                break
+    finally:
+        # Also on cancellation: a lane left behind without its consumer would
+        # swallow every later job for its key
+        if _lanes.get(key) is lane:
+            del _lanes[key]
 
-    while True:
-        try:
-            # Block until a job is available (FIFO order guaranteed by queue.Queue)
-            request_id = _job_queue.get(block=True)
-            print(f"[FIFO Worker] Processing job: {request_id[:8]}...")
 
-            # Process the job (blocking - ensures sequential processing)
-            _process_job(request_id)
+def _schedule_delivery(callback_url: str, payload: Optional[dict], request_id: uuid.UUID):
+    """
+    Deliver a webhook in the background, behind the previous one for the same URL.
+
+    Deliveries are chained per callback URL, not per lane: each receiver gets
+    its callbacks in submission order, while one receiver's failures and
+    retry backoff (up to 14s) delay nobody else's callbacks.
+    A full chain (MAX_QUEUED_DELIVERIES) parks the request ID instead; it is
+    chained as earlier deliveries finish. payload=None loads it from the row.
+    """
+    queued = _queued_deliveries.get(callback_url, 0)
+    if queued >= MAX_QUEUED_DELIVERIES or callback_url in _parked_deliveries:
+        _parked_deliveries.setdefault(callback_url, deque()).append(request_id)
+        return
+    _chain_delivery(callback_url, payload, request_id)
 
-            # Mark task as done
-            _job_queue.task_done()
-            print(f"[FIFO Worker] Completed job: {request_id[:8]}")
 
-        except Exception as e:
-            print(f"[FIFO Worker] Error processing job: {e}")
+def _chain_delivery(callback_url: str, payload: Optional[dict], request_id: uuid.UUID):
+    task = asyncio.create_task(
+        _deliver_in_order(_deliveries.get(callback_url), callback_url, payload, request_id)
+    )
+    _queued_deliveries[callback_url] = _queued_deliveries.get(callback_url, 0) + 1
+    _deliveries[callback_url] = task
+    _delivery_tasks.add(task)
+    task.add_done_callback(partial(_forget_delivery, callback_url))
 
 
-def enqueue_job(request_id: str) -> int:
+def _forget_delivery(callback_url: str, task: asyncio.Task):
     """
-    Add a job to the FIFO queue and return its queue position.
+    Drop a finished delivery (and the chain tail, unless a newer one replaced
+    it), then chain the next parked request for the URL.
+    """
+    _delivery_tasks.discard(task)
+    if queued := _queued_deliveries[callback_url] - 1:
+        _queued_deliveries[callback_url] = queued
+    else:
+        del _queued_deliveries[callback_url]
+    if _deliveries.get(callback_url) is task:
+        del _deliveries[callback_url]
+
+    # While stopping, parked callbacks stay PENDING in the database for the next start
+    parked = _parked_deliveries.get(callback_url)
+    if parked and not _stopping:
+        request_id = parked.popleft()
+        if not parked:
+            del _parked_deliveries[callback_url]
+        _chain_delivery(callback_url, None, request_id)
+
+
+async def stop(timeout: float = SHUTDOWN_GRACE):
+    """
+    Stop the worker - called from the lifespan BEFORE the HTTP client and the
+    callback log batcher are closed, since jobs and deliveries use both.
+
+    No new jobs start (queued ones stay PENDING in the database and
+    recover_pending_jobs() resumes them on the next start). Running jobs and
+    callback deliveries get `timeout` seconds to finish, then are cancelled;
+    a cancelled job is put back to PENDING.
+    """
+    global _stopping
+    _stopping = True
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    # Re-collected each round: a job finishing during the grace period may
+    # still schedule its callback delivery
+    while tasks := [lane.consumer for lane in _lanes.values() if lane.consumer] + list(_delivery_tasks):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            break
+        await asyncio.wait(tasks, timeout=remaining)
+
+
+async def _deliver_in_order(
+    previous: Optional[asyncio.Task], callback_url: str, payload: Optional[dict], request_id: uuid.UUID
+):
+    """Send one job's callback once the lane's previous callback has settled."""
+    if previous is not None:
+        await asyncio.wait([previous])
+    try:
+        if payload is None:
+            payload = await _load_callback_payload(request_id)
+            if payload is None:
+                return  # deleted, or already settled (e.g. by another worker process)
+        await send_callback_with_retry(callback_url, payload, request_id)
+    except Exception as e:
+        log.error("[Callback] Delivery failed for %.8s: %s", request_id, e)
+
+
+async def enqueue_job(
+    request_id: uuid.UUID,
+    priority: bool = False,
+    queue_position: Optional[int] = None,
+    callback_url: Optional[str] = None,
+) -> int:
+    """
+    Add a job to its FIFO lane and return its queue position.
 
     FIFO GUARANTEE:
-    - Jobs are added to a thread-safe queue in submission order
-    - queue_position is assigned atomically using MAX() + 1
-    - Worker processes jobs strictly in queue order
+    - Jobs are appended to their lane in submission order
+    - queue_position is assigned atomically by the queue_pos_seq sequence
+    - Each lane is processed strictly in queue order
 
     Args:
         request_id: The request ID to process
+        priority: Internal (resumed jobs) - goes first for a worker slot, never
+            ahead of earlier jobs in its lane
+        queue_position / callback_url: As returned by the INSERT in
+            async_controller - when given, enqueueing needs no DB round trip
 
     Returns:
         queue_position: The position in the FIFO queue (1-based)
     """
-    # Check if queue_position already set (by async_controller)
-    session = Session()
-    position = None
-    try:
-        request = session.query(Request).filter(Request.id == request_id).first()
-        if request:
-            if request.queue_position:
-                # Already set by async_controller
-                position = request.queue_position
-            else:
-                # Fallback: set it now
-                position = _get_next_queue_position()
-                request.queue_position = position
-                session.commit()
-    finally:
-        session.close()
+    if _stopping:
+        # Shutting down: leave it PENDING for recover_pending_jobs() on the next start
+        return queue_position or 0
+
+    position = queue_position
+    if position is None:
+        position, callback_url = await _assign_queue_position(request_id)
 
-    # Add to FIFO queue
-    _job_queue.put(request_id)
+    # Add to the lane, starting a consumer for a new lane
+    key = _lane_key(callback_url)
+    lane = _lanes.get(key)
+    start_consumer = lane is None
+    if start_consumer:
+        lane = _lanes[key] = _Lane()
 
-    # Ensure worker is running
-    _ensure_worker_running()
+    lane.jobs.append((request_id, priority))
 
-    print(f"[FIFO Queue] Enqueued job {request_id[:8]}... at position {position}")
+    if start_consumer:
+        lane.consumer = asyncio.create_task(_lane_worker(key, lane))
+
+    log.info("[FIFO Queue] Enqueued job %.8s... at position %s", request_id, position)
     return position or 0
 
 
-def get_queue_status() -> dict:
+async def recover_pending_jobs() -> int:
+    """
+    Re-enqueue async requests still PENDING in the database (called at startup).
+
+    The requests table is the durable record of the queue: the in-memory lanes
+    are only a cache of it. Jobs accepted before a crash or restart - including
+    ones whose enqueue background task never ran - resume in queue_position
+    order. Jobs left PROCESSING by a crash are not retried: they may have
+    partly run, and their callback may have gone out.
+
+    COMPLETED requests whose callback is still PENDING (delivery cut off by
+    shutdown, or parked behind a slow receiver) get their callback re-sent, in
+    queue_position order per URL; the payload is rebuilt from result_payload.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(Request.id, Request.queue_position, Request.callback_url)
+            .where(Request.mode == "async", Request.status == STATUS_PENDING)
+            .order_by(Request.queue_position)
+        )
+        rows = result.all()
+
+    for request_id, queue_position, callback_url in rows:
+        # Priority: they already waited through the restart
+        await enqueue_job(request_id, priority=True, queue_position=queue_position, callback_url=callback_url)
+    if rows:
+        log.info("[FIFO Queue] Recovered %d pending jobs", len(rows))
+
+    async with async_session() as session:
+        result = await session.execute(
+            select(Request.id, Request.callback_url)
+            .where(
+                Request.mode == "async",
+                Request.status == STATUS_COMPLETED,
+                Request.callback_status == CALLBACK_PENDING,
+                Request.callback_url.is_not(None),
+            )
+            .order_by(Request.queue_position)
+        )
+        callbacks = result.all()
+
+    for request_id, callback_url in callbacks:
+        _schedule_delivery(callback_url, None, request_id)
+    if callbacks:
+        log.info("[Callback] Re-sending %d undelivered callbacks", len(callbacks))
+    return len(rows)
+
+
+async def get_queue_status() -> dict:
     """
     Get current queue statistics.
 
     Returns:
         dict with queue_size, is_processing, etc.
     """
-    session = Session()
-    try:
-        pending_count = session.query(Request).filter(
-            Request.mode == "async",
-            Request.status.in_([STATUS_PENDING, STATUS_PROCESSING])
-        ).count()
-
-        return {
-            "queue_size": _job_queue.qsize(),
-            "pending_jobs": pending_count,
-            "worker_alive": _worker_thread is not None and _worker_thread.is_alive(),
-        }
-    finally:
-        session.close()
+    async with async_session() as session:
+        pending_count = await session.scalar(
+            select(func.count()).select_from(Request).where(
+                Request.mode == "async",
+                Request.status.in_([STATUS_PENDING, STATUS_PROCESSING]),
+            )
+        )
+
+    return {
+        "queue_size": sum(len(lane) for lane in _lanes.values()),
+        "priority_queue_size": sum(priority for lane in _lanes.values() for _, priority in lane.jobs),
+        "lanes_waiting_for_slot": _worker_slots.waiting(True) + _worker_slots.waiting(False),
+        "pending_jobs": pending_count,
+        "active_lanes": len(_lanes),
+        "callback_receivers_pending": len(_deliveries),
+        "callbacks_parked": sum(len(parked) for parked in _parked_deliveries.values()),
+        "worker_concurrency": WORKER_CONCURRENCY,
+    }
 
 
 # ============================================================================
 # SSRF PROTECTION
 # ============================================================================
+_LOOPBACK_HOSTS = frozenset({"localhost", "127.0.0.1", "0.0.0.0", "::1"})
+_DEMO_RECEIVER_HOSTS = frozenset({"localhost", "127.0.0.1"})
+_DEMO_RECEIVER_PATH = "/api/callbacks/receive"
+
+
+def _ipv4_network(cidr: str) -> tuple[int, int]:
+    network = ipaddress.IPv4Network(cidr)
+    return int(network.network_address), int(network.netmask)
+
+
+# Blocked IPv4 ranges as (network, mask) ints: everything ipaddress counts as
+# private/loopback/reserved, plus link-local, CGNAT and multicast
+_BLOCKED_IPV4 = tuple(_ipv4_network(cidr) for cidr in (
+    "0.0.0.0/8", "10.0.0.0/8", "100.64.0.0/10", "127.0.0.0/8", "169.254.0.0/16",
+    "172.16.0.0/12", "192.0.0.0/24", "192.0.2.0/24", "192.168.0.0/16", "198.18.0.0/15",
+    "198.51.100.0/24", "203.0.113.0/24", "224.0.0.0/4", "240.0.0.0/4",
+))
+
+
+def _is_blocked_ip(hostname: str) -> Optional[bool]:
+    """True/False for IP literals, None for hostnames."""
+    try:
+        # C-level parse of dotted-quad IPv4, then integer mask checks
+        ip = int.from_bytes(socket.inet_pton(socket.AF_INET, hostname), "big")
+        return any(ip & mask == network for network, mask in _BLOCKED_IPV4)
+    except OSError:
+        pass
+    if ":" in hostname:  # IPv6 literal - rare, use ipaddress
+        try:
+            ip = ipaddress.IPv6Address(hostname)
+            return ip.is_private or ip.is_loopback or ip.is_reserved or ip.is_link_local or ip.is_multicast
+        except ValueError:
+            return None
+    return None
+
+
+@lru_cache(maxsize=4096)
 def is_safe_callback_url(url: str) -> bool:
     """
     Check if callback URL is safe (SSRF protection).
 
+    The decision depends only on the URL string, so results are cached -
+    benchmark runs hammer the same callback URL thousands of times.
+
     Blocks:
+    - Anything but http:// and https://
     - localhost, 127.0.0.1, ::1 (loopback)
     - Private IP ranges (10.x, 172.16.x, 192.168.x)
-    - Reserved addresses
+    - Reserved, link-local and multicast addresses
 
     Allows:
     - Demo callback receiver on localhost (for testing only)
+
+    Parsed with urlparse, not a hand-rolled regex: the hostname must be the
+    one httpx will connect to (userinfo, IPv6 brackets, ...) - and with the
+    cache, parsing cost doesn't matter.
     """
     try:
         parsed = urlparse(url)
         hostname = parsed.hostname
         path = parsed.path
 
-        if not hostname:
+        if parsed.scheme not in ("http", "https") or not hostname:
             return False
 
         # Allow demo callback receiver on localhost (for demo purposes)
-        if hostname in ("localhost", "127.0.0.1") and "/api/callbacks/receive" in path:
+        if hostname in _DEMO_RECEIVER_HOSTS and path.endswith(_DEMO_RECEIVER_PATH):
             return True
 
         # Block localhost variations
-        if hostname in ("localhost", "127.0.0.1", "0.0.0.0", "::1"):
+        if hostname in _LOOPBACK_HOSTS:
             return False
 
-        # Try to resolve and check if it's a private IP
-        try:
-            ip = ipaddress.ip_address(hostname)
-            if ip.is_private or ip.is_loopback or ip.is_reserved:
-                return False
-        except ValueError:
-            # Not an IP address, it's a hostname - allow it
-            pass
-
-        return True
+        # IP literal in a blocked range? (a plain hostname is allowed)
+        return not _is_blocked_ip(hostname)
     except Exception:
         return False
 
@@ -249,165 +547,204 @@ def is_safe_callback_url(url: str) -> bool:
 # ============================================================================
 # CALLBACK DELIVERY WITH RETRY
 # ============================================================================
-def send_callback_with_retry(callback_url: str, payload: dict, request_id: str) -> bool:
+async def _log_attempt(
+    request_id: uuid.UUID,
+    attempt_number: int,
+    status_code: Optional[int],
+    success: bool,
+    error_message: Optional[str],
+    response_time_ms: int,
+    attempted_at: datetime,
+):
+    """Hand one callback_logs row to the batcher (written within ~20ms)."""
+    await callback_log_batcher.record({
+        "request_id": request_id,
+        "attempt_number": attempt_number,
+        "status_code": status_code,
+        "success": success,
+        "error_message": error_message,
+        "response_time_ms": response_time_ms,
+        "attempted_at": attempted_at,
+    })
+
+
+async def send_callback_with_retry(callback_url: str, payload: dict, request_id: uuid.UUID) -> bool:
     """
     Send callback with exponential backoff retry logic.
 
     Retry Strategy:
     - Max 3 attempts
-    - Exponential backoff: 2s, 4s, 8s
+    - Exponential backoff: 2s, 4s, 8s (asyncio.sleep - the loop keeps serving)
     - Only 5xx errors trigger retries
     - 4xx errors are NOT retried (client error)
-    - Each attempt logged to callback_logs table
+    - Each attempt logged to callback_logs table (via the batcher, no commit here)
+    - Attempt count and outcome are written in ONE UPDATE + COMMIT at the end
+    - Reuses the shared client's keep-alive / HTTP/2 connections across attempts
+    - The payload is encoded once (orjson) and the same bytes sent on every attempt
     """
-    session = Session()
+    client = get_http()
+    body = orjson.dumps(payload)
+    callback_status = CALLBACK_FAILED
+    attempt_number = 0
+
+    for attempt in range(MAX_RETRIES):
+        attempt_number = attempt + 1
+        # Wall clock once for the log's attempted_at; the monotonic clock for
+        # the elapsed time (immune to clock adjustments)
+        attempted_at = datetime.now(timezone.utc)
+        start_time = time.perf_counter()
+        status_code = None
+        error_message = None
 
-    try:
-        request = session.query(Request).filter(Request.id == request_id).first()
-
-        for attempt in range(MAX_RETRIES):
-            attempt_number = attempt + 1
-            start_time = time.time()
-            status_code = None
-            error_message = None
-
-            try:
-                # Update attempt count on request
-                if request:
-                    request.callback_attempts = attempt_number
-                    session.commit()
-
-                response = httpx.post(
-                    callback_url,
-                    json=payload,
-                    timeout=10,
-                )
-                status_code = response.status_code
-                response_time_ms = int((time.time() - start_time) * 1000)
-
-                if response.status_code < 500:
-                    # Success or client error (don't retry 4xx)
-                    if request:
-                        request.callback_status = CALLBACK_SUCCESS
-                        session.commit()
-
-                    # Log successful attempt
-                    log = CallbackLog(
-                        request_id=request_id,
-                        attempt_number=attempt_number,
-                        status_code=status_code,
-                        success=True,
-                        response_time_ms=response_time_ms,
-                    )
-                    session.add(log)
-                    session.commit()
-                    return True
-
-                error_message = f"Server returned {response.status_code}"
-                print(f"[Callback] Returned {response.status_code}, attempt {attempt_number}/{MAX_RETRIES}")
-
-            except Exception as e:
-                error_message = str(e)
-                print(f"[Callback] Failed: {e}, attempt {attempt_number}/{MAX_RETRIES}")
-
-            # Log failed attempt
-            response_time_ms = int((time.time() - start_time) * 1000)
-            log = CallbackLog(
-                request_id=request_id,
-                attempt_number=attempt_number,
-                status_code=status_code,
-                success=False,
-                error_message=error_message,
-                response_time_ms=response_time_ms,
+        try:
+            response = await client.post(callback_url, content=body, headers=CALLBACK_HEADERS)
+            status_code = response.status_code
+
+            if response.status_code < 500:
+                # Success or client error (don't retry 4xx)
+                callback_status = CALLBACK_SUCCESS
+
+                # Log successful attempt
+                response_time_ms = int((time.perf_counter() - start_time) * 1000)
+                await _log_attempt(request_id, attempt_number, status_code, True, None, response_time_ms, attempted_at)
+                break
+
+            error_message = f"Server returned {response.status_code}"
+            log.warning("[Callback] Returned %s, attempt %s/%s", response.status_code, attempt_number, MAX_RETRIES)
+
+        except Exception as e:
+            error_message = str(e)
+            log.warning("[Callback] Failed: %s, attempt %s/%s", e, attempt_number, MAX_RETRIES)
+
+        # Log failed attempt
+        response_time_ms = int((time.perf_counter() - start_time) * 1000)
+        await _log_attempt(request_id, attempt_number, status_code, False, error_message, response_time_ms, attempted_at)
+
+        # Wait before retry (except on last attempt)
+        if attempt < MAX_RETRIES - 1:
+            delay = RETRY_DELAYS[attempt]
+            log.info("[Callback] Retrying in %ss...", delay)
+            await asyncio.sleep(delay)
+
+    # Record attempts + final status in a single commit
+    async with async_session() as session:
+        await session.execute(
+            update(Request)
+            .where(Request.id == request_id)
+            .values(callback_attempts=attempt_number, callback_status=callback_status)
+        )
+        await session.commit()
+    return callback_status == CALLBACK_SUCCESS
+
+
+def _callback_payload(request_id: uuid.UUID, queue_position: Optional[int], result: dict) -> dict:
+    return {
+        "request_id": str(request_id),
+        "status": "completed",
+        "queue_position": queue_position,
+        **result,
+    }
+
+
+async def _load_callback_payload(request_id: uuid.UUID) -> Optional[dict]:
+    """Rebuild a parked/recovered callback from its row - None once it is settled."""
+    async with async_session() as session:
+        row = (await session.execute(
+            select(Request.queue_position, Request.result_payload)
+            .where(
+                Request.id == request_id,
+                Request.status == STATUS_COMPLETED,
+                Request.callback_status == CALLBACK_PENDING,
             )
-            session.add(log)
-            session.commit()
-
-            # Wait before retry (except on last attempt)
-            if attempt < MAX_RETRIES - 1:
-                delay = RETRY_DELAYS[attempt]
-                print(f"[Callback] Retrying in {delay}s...")
-                time.sleep(delay)
-
-        # All retries exhausted
-        if request:
-            request.callback_status = CALLBACK_FAILED
-            session.commit()
-        return False
-    finally:
-        session.close()
+        )).one_or_none()
+    return _callback_payload(request_id, row.queue_position, row.result_payload) if row else None
 
 
 # ============================================================================
 # JOB PROCESSING
 # ============================================================================
-def _process_job(request_id: str):
+async def _process_job(request_id: uuid.UUID) -> Optional[tuple[str, dict, uuid.UUID]]:
     """
     Process a single job from the FIFO queue.
 
     Steps:
-    1. Mark request as PROCESSING
-    2. Generate the report (shared work logic)
-    3. Mark request as COMPLETED with result
-    4. Send webhook callback (with retry)
+    1. Claim the request: PENDING -> PROCESSING in one UPDATE ... RETURNING
+       that also loads what the job needs. Conditional on PENDING, so a job
+       enqueued twice (startup recovery in several workers) runs only once
+    2. Generate the report (shared work logic, off the event loop)
+    3. Mark request as COMPLETED with result - and, if the callback URL is
+       blocked, its FAILED callback_status - in the same commit
+    4. Return the webhook to send (callback_url, payload, request_id); the
+       lane worker delivers it with retry, or None if there is nothing to send
     """
-    session = Session()
-    request = None
+    async with async_session() as session:
+        job = None
 
-    try:
-        request = session.query(Request).filter(Request.id == request_id).first()
-        if not request:
-            print(f"[Job] Request {request_id} not found, skipping")
-            return
-
-        # Update to processing
-        request.status = STATUS_PROCESSING
-        session.commit()
-
-        # Do the work (shared with sync endpoint)
-        result = generate_report(request.input_payload)
-
-        # Update with result
-        request.status = STATUS_COMPLETED
-        request.result_payload = result
-        request.completed_at = datetime.now(timezone.utc)
-        session.commit()
-
-        # Send callback
-        if request.callback_url:
-            if not is_safe_callback_url(request.callback_url):
-                print(f"[Job] Blocked unsafe callback URL: {request.callback_url}")
-                request.callback_status = CALLBACK_FAILED
-                session.commit()
-            else:
-                callback_payload = {
-                    "request_id": request.id,
-                    "status": "completed",
-                    "queue_position": request.queue_position,
-                    **result,
-                }
-                send_callback_with_retry(request.callback_url, callback_payload, request_id)
+        try:
+            job = (await session.execute(
+                update(Request)
+                .where(Request.id == request_id, Request.status == STATUS_PENDING)
+                .values(status=STATUS_PROCESSING)
+                .returning(Request.input_payload, Request.callback_url, Request.queue_position)
+            )).one_or_none()
+            if job is None:
+                log.warning("[Job] Request %s not found or already claimed, skipping", request_id)
+                return None
+            await session.commit()
+
+            # Do the work (shared with sync endpoint) off the event loop
+            result = await run_report(job.input_payload)
+
+            # Update with result
+            values = {
+                "status": STATUS_COMPLETED,
+                "result_payload": result,
+                "completed_at": datetime.now(timezone.utc),
+            }
+            send_callback = bool(job.callback_url)
+            # Defense in depth: async_controller already rejects unsafe URLs
+            if send_callback and not is_safe_callback_url(job.callback_url):
+                log.warning("[Job] Blocked unsafe callback URL: %s", job.callback_url)
+                values["callback_status"] = CALLBACK_FAILED
+                send_callback = False
+            await session.execute(update(Request).where(Request.id == request_id).values(**values))
+            await session.commit()
+
+            # Callback to send
+            if send_callback:
+                return job.callback_url, _callback_payload(request_id, job.queue_position, result), request_id
+
+        except asyncio.CancelledError:
+            # Shutdown grace period ran out: hand the job back to the queue
+            if job is not None:
+                await session.rollback()
+                await session.execute(
+                    update(Request).where(Request.id == request_id).values(status=STATUS_PENDING)
+                )
+                await session.commit()
+            raise
 
-    except Exception as e:
-        print(f"[Job] Failed: {e}")
-        if request:
-            request.status = STATUS_FAILED
-            request.result_payload = {"error": str(e)}
-            session.commit()
-    finally:
-        session.close()
+        except Exception as e:
+            log.error("[Job] Failed: %s", e)
+            if job is not None:
+                await session.rollback()
+                await session.execute(
+                    update(Request)
+                    .where(Request.id == request_id)
+                    .values(status=STATUS_FAILED, result_payload={"error": str(e)})
+                )
+                await session.commit()
+        return None
 
 
 # ============================================================================
 # LEGACY COMPATIBILITY (deprecated, use enqueue_job instead)
 # ============================================================================
-def process_job_in_background(request_id: str):
+async def process_job_in_background(request_id: uuid.UUID):
     """
     DEPRECATED: Use enqueue_job() instead for FIFO ordering.
 
     This function is kept for backwards compatibility but now uses
     the FIFO queue internally.
     """
-    return enqueue_job(request_id)
-
-
+    return await enqueue_job(request_id)
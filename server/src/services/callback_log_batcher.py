@@ -0,0 +1,122 @@
+"""
+Callback Log Batcher - amortizes callback_logs inserts
+
+Every webhook attempt produces one callback_logs row. Instead of one
+INSERT + COMMIT per attempt, rows are put on a bounded asyncio.Queue and a
+single background task writes them as a multi-row INSERT:
+- Flushes every 20ms, or as soon as 100 rows are waiting
+- Queue is bounded at 10k rows so a slow database applies backpressure
+  to producers instead of growing memory without limit
+- Started/stopped from the FastAPI lifespan; stop() drains what's queued.
+  Without start() (scripts) record() writes the row directly; after stop()
+  it raises instead of queueing rows nobody will write
+
+Rows are plain dicts with every CallbackLog column the worker sets
+(attempted_at included, so the timestamp is the attempt time, not flush time).
+If a batch hits an FK violation (a request deleted before the flush), only
+that request's rows are dropped - the rest of the batch is written again.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from src.database import async_session
+from src.models import CallbackLog, Request
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 0.02  # seconds
+MAX_PENDING = 10_000
+
+_queue: Optional[asyncio.Queue] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_task: Optional[asyncio.Task] = None
+_stopped = False
+
+
+async def start():
+    """Start the batcher task on the running event loop."""
+    global _queue, _loop, _task, _stopped
+    _stopped = False
+    _loop = asyncio.get_running_loop()
+    _queue = asyncio.Queue(maxsize=MAX_PENDING)
+    _task = asyncio.create_task(_run())
+
+
+async def stop():
+    """Flush anything still queued and stop the batcher task."""
+    global _queue, _task, _stopped
+    _stopped = True
+    if _task is None:
+        return
+    await _queue.put(None)  # sentinel: flush and exit
+    await _task
+    _queue = _task = None
+
+
+async def record(row: dict):
+    """
+    Queue a log row.
+
+    Waits while the queue is full (backpressure).
+    """
+    if _stopped:
+        raise RuntimeError("callback log batcher is stopped (app shutting down)")
+    if _queue is None:
+        await _flush([row])  # batcher never started (e.g. scripts): write it now
+        return
+    await _queue.put(row)
+
+
+async def _run():
+    """Collect rows until the batch is full or FLUSH_INTERVAL passes, then write them."""
+    while True:
+        row = await _queue.get()
+        if row is None:
+            return
+        batch = [row]
+        deadline = _loop.time() + FLUSH_INTERVAL
+        stopping = False
+
+        while len(batch) < BATCH_SIZE:
+            timeout = deadline - _loop.time()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                stopping = True
+                break
+            batch.append(row)
+
+        await _flush(batch)
+        if stopping:
+            return
+
+
+async def _flush(batch: list[dict]):
+    try:
+        async with async_session() as session:
+            try:
+                await session.execute(insert(CallbackLog), batch)  # executemany
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                # Keep the rows whose request still exists and write those
+                existing = set((await session.scalars(
+                    select(Request.id).where(Request.id.in_({row["request_id"] for row in batch}))
+                )).all())
+                kept = [row for row in batch if row["request_id"] in existing]
+                log.warning("[Callback Logs] Dropped %d rows for deleted requests", len(batch) - len(kept))
+                if kept:
+                    await session.execute(insert(CallbackLog), kept)
+                    await session.commit()
+    except Exception as e:
+        log.error("[Callback Logs] Failed to write %d rows: %s", len(batch), e)
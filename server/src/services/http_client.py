@@ -0,0 +1,56 @@
+"""
+Shared HTTP Client - one pooled httpx.AsyncClient for webhook callbacks
+
+Opening a client per callback pays a fresh TCP + TLS handshake on every
+attempt. A single long-lived client keeps connections alive across retries
+and across requests, and HTTP/2 multiplexes many callbacks to the same host
+onto one connection.
+- Created/closed from the FastAPI lifespan (like callback_log_batcher);
+  after stop(), get_http() raises instead of opening a client nobody closes
+- Requires the h2 package (httpx[http2]); falls back to HTTP/1.1 keep-alive
+"""
+
+from typing import Optional
+
+import httpx
+
+CALLBACK_TIMEOUT = 10  # seconds
+CALLBACK_LIMITS = httpx.Limits(max_keepalive_connections=100, max_connections=200)
+
+_client: Optional[httpx.AsyncClient] = None
+_closed = False
+
+
+def _new_client() -> httpx.AsyncClient:
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.AsyncClient(http2=http2, limits=CALLBACK_LIMITS, timeout=CALLBACK_TIMEOUT)
+
+
+async def start():
+    """Create the shared client."""
+    global _client, _closed
+    _client = _new_client()
+    _closed = False
+
+
+async def stop():
+    """Close the shared client and its pooled connections."""
+    global _client, _closed
+    _closed = True
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http() -> httpx.AsyncClient:
+    """Return the shared client (created lazily if the lifespan hasn't run, e.g. in scripts)."""
+    global _client
+    if _closed:
+        raise RuntimeError("HTTP client is closed (app shutting down)")
+    if _client is None:
+        _client = _new_client()
+    return _client
@@ -3,20 +3,33 @@ Report Generation Service
 
 Simulates a CPU-intensive report generation process that:
 1. Generates realistic financial transaction data
-2. Creates a CSV file with the report
-3. Returns metadata including download URL
+2. Returns summary stats and metadata including download URL
+3. Writes the CSV (gzipped, <file_name>.gz) only when it is first
+   downloaded - see write_report_file
 
-The artificial delay (10ms per transaction) simulates real-world
-scenarios like database queries, aggregations, and file I/O.
+The artificial delay (10ms per transaction, slept once per report)
+simulates real-world scenarios like database queries, aggregations, and
+file I/O. SIMULATE_IO_DELAY=false turns it off.
+
+Callers use run_report() to keep the work off the event loop: a worker
+thread by default, or a process pool (REPORT_PROCESSES > 0) so CPU-bound
+generation runs in parallel instead of contending for the GIL.
 """
 
+import asyncio
 import csv
+import gzip
 import hashlib
+import multiprocessing
 import os
 import random
+import secrets
 import time
-import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional
+
+from src.config import REPORT_PROCESSES, SIMULATE_IO_DELAY
 
 
 # Directory to store generated CSV reports
@@ -27,99 +40,134 @@ else:
     REPORTS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "reports")
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
+CSV_COLUMNS = ("Transaction ID", "Date", "Type", "Category", "Description", "Amount")
+
+# Created on first use; "spawn" so children don't inherit the event loop or DB sockets
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+# First-download CSV writes in flight by file name (see materialize_report)
+_pending_writes: dict[str, asyncio.Future] = {}
+
+
+async def run_report(payload: dict) -> dict:
+    """Run generate_report without blocking the event loop."""
+    global _process_pool
+    if REPORT_PROCESSES <= 0:
+        return await asyncio.to_thread(generate_report, payload)
+
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=REPORT_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return await asyncio.get_running_loop().run_in_executor(_process_pool, generate_report, payload)
+
+
+async def materialize_report(result: dict) -> str:
+    """Run write_report_file off the event loop; concurrent first downloads share one write."""
+    file_name = result["file_name"]
+    write = _pending_writes.get(file_name)
+    if write is None:
+        write = _pending_writes[file_name] = asyncio.ensure_future(asyncio.to_thread(write_report_file, result))
+        write.add_done_callback(lambda _: _pending_writes.pop(file_name, None))
+    # Shielded: a client hanging up doesn't cancel the write others are waiting on
+    return await asyncio.shield(write)
+
+
+def shutdown_report_pool():
+    """Stop the report processes (called from the app lifespan)."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+REVENUE_CATEGORIES = ("Sales Income", "Service Fees", "Interest Income", "Consulting")
+EXPENSE_CATEGORIES = ("Payroll", "Marketing", "Office Supplies", "Software", "Travel", "Utilities")
+
+
+def _draw_transactions(report_name: str, num_transactions: int):
+    """
+    Yield (category_type, category_name, amount, days_ago) per transaction.
+
+    Deterministic per report name, so the summary (at job time) and the CSV
+    (at first download) see the same transactions.
+    """
+    # Private generator seeded from the name, so reports generated concurrently
+    # (WORKER_CONCURRENCY > 1) don't reseed each other
+    seed = int.from_bytes(hashlib.md5(report_name.encode()).digest()[:4], "big")  # == int(hexdigest()[:8], 16)
+    rng = random.Random(seed)
+
+    # Draw straight from the generator's C methods: random.py's choice()/
+    # randint()/uniform() wrappers cost more than the draws themselves.
+    # Same draws as those wrappers, so a report name still yields the same
+    # transactions.
+    rand, getrandbits = rng.random, rng.getrandbits
+
+    def draw_index(n: int) -> int:
+        """rng.randrange(n) minus its argument checks."""
+        bits = n.bit_length()
+        r = getrandbits(bits)
+        while r >= n:
+            r = getrandbits(bits)
+        return r
+
+    n_revenue, n_expense = len(REVENUE_CATEGORIES), len(EXPENSE_CATEGORIES)
+
+    for _ in range(num_transactions):
+        # 60% revenue, 40% expenses to ensure positive net income
+        if rand() < 0.6:
+            category_name = REVENUE_CATEGORIES[draw_index(n_revenue)]
+            amount = round(5000 + 45000 * rand(), 2)  # uniform(5000, 50000): higher amounts for revenue
+            yield "Revenue", category_name, amount, draw_index(31)
+        else:
+            category_name = EXPENSE_CATEGORIES[draw_index(n_expense)]
+            amount = round(500 + 14500 * rand(), 2)  # uniform(500, 15000): lower amounts for expenses
+            yield "Expense", category_name, amount, draw_index(31)
+
 
 def generate_report(payload: dict) -> dict:
     """
-    Generate a financial report as a CSV file.
+    Generate a financial report: summary stats now, the CSV on first download.
+
+    The CSV is not written here - the job only pays for the numbers. The
+    download route calls write_report_file() with this result the first time
+    the file is requested; the transactions are deterministic per report
+    name, and generated_at pins the dates.
 
     Args:
         payload: {"num_transactions": 50, "report_name": "Q1_Finance"}
 
     Returns:
-        dict with file_id, file_name, download_url, and summary stats
+        dict with file_id, file_name, download_url, generated_at and summary stats
 
     Performance: ~10ms per transaction (simulated processing time)
     """
     num_transactions = payload.get("num_transactions", 50)
     report_name = payload.get("report_name", "Monthly_Report")
 
-    # Deterministic seed for reproducibility
-    seed = int(hashlib.md5(report_name.encode()).hexdigest()[:8], 16)
-    random.seed(seed)
-
-    # Generate realistic financial transactions
-    revenue_categories = ["Sales Income", "Service Fees", "Interest Income", "Consulting"]
-    expense_categories = ["Payroll", "Marketing", "Office Supplies", "Software", "Travel", "Utilities"]
+    # Simulate processing time (10ms per transaction) - one sleep for the whole
+    # report instead of a wake-up per row
+    if SIMULATE_IO_DELAY:
+        time.sleep(num_transactions * 0.01)
 
-    transactions = []
     total_revenue = 0
     total_expenses = 0
-
-    for i in range(num_transactions):
-        # Simulate processing time (10ms per transaction)
-        time.sleep(0.01)
-
-        # 60% revenue, 40% expenses to ensure positive net income
-        is_revenue = random.random() < 0.6
-        if is_revenue:
-            category_type = "Revenue"
-            category_name = random.choice(revenue_categories)
-            amount = round(random.uniform(5000, 50000), 2)  # Higher amounts for revenue
-        else:
-            category_type = "Expense"
-            category_name = random.choice(expense_categories)
-            amount = round(random.uniform(500, 15000), 2)  # Lower amounts for expenses
-        tx_date = datetime.now() - timedelta(days=random.randint(0, 30))
-
+    for category_type, _, amount, _ in _draw_transactions(report_name, num_transactions):
         if category_type == "Revenue":
             total_revenue += amount
         else:
             total_expenses += amount
 
-        transactions.append({
-            "Transaction ID": f"TXN-{i+1:05d}",
-            "Date": tx_date.strftime("%Y-%m-%d"),
-            "Type": category_type,
-            "Category": category_name,
-            "Description": f"{category_name} - {tx_date.strftime('%B %Y')}",
-            "Amount": f"${amount:,.2f}",
-            "Amount_Raw": amount,
-        })
-
-    # Generate CSV content
-    file_id = str(uuid.uuid4())[:8]
+    file_id = secrets.token_hex(4)  # same 8 hex chars as str(uuid4())[:8], without the uuid
     file_name = f"{report_name}_{file_id}.csv"
-    file_path = os.path.join(REPORTS_DIR, file_name)
-
-    with open(file_path, "w", newline="") as f:
-        # Write header info
-        f.write(f"# Financial Report: {report_name}\n")
-        f.write(f"# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"# Period: Last 30 Days\n")
-        f.write(f"# Total Transactions: {num_transactions}\n")
-        f.write(f"#\n")
-        f.write(f"# SUMMARY\n")
-        f.write(f"# Total Revenue: ${total_revenue:,.2f}\n")
-        f.write(f"# Total Expenses: ${total_expenses:,.2f}\n")
-        f.write(f"# Net Income: ${total_revenue - total_expenses:,.2f}\n")
-        f.write(f"#\n")
-
-        # Write transactions
-        writer = csv.DictWriter(f, fieldnames=["Transaction ID", "Date", "Type", "Category", "Description", "Amount"])
-        writer.writeheader()
-        for tx in transactions:
-            row = {k: v for k, v in tx.items() if k != "Amount_Raw"}
-            writer.writerow(row)
-
-    # Calculate file size
-    file_size = os.path.getsize(file_path)
 
     return {
         "report_name": report_name,
         "file_id": file_id,
         "file_name": file_name,
-        "file_size_bytes": file_size,
         "download_url": f"/api/reports/{file_name}",
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
         "summary": {
             "total_transactions": num_transactions,
             "total_revenue": round(total_revenue, 2),
@@ -129,3 +177,69 @@ def generate_report(payload: dict) -> dict:
         "processing_time_ms": num_transactions * 10,
         "status": "success",
     }
+
+
+def write_report_file(result: dict) -> str:
+    """
+    Write the CSV for a generate_report() result and return its path.
+
+    Stored pre-compressed as <file_name>.gz: CSV text shrinks several-fold and
+    downloads are served as-is with Content-Encoding: gzip (level 1 = fastest).
+    Written to a temp file and renamed, so concurrent first downloads never
+    see a partial file.
+    """
+    report_name = result["report_name"]
+    num_transactions = result["summary"]["total_transactions"]
+    generated_at = datetime.fromisoformat(result["generated_at"])
+
+    # The 31 possible dates (last 30 days before generation), formatted once
+    # instead of per row: day offset -> ("%Y-%m-%d", "%B %Y")
+    dates = []
+    for days_ago in range(31):
+        tx_date = generated_at - timedelta(days=days_ago)
+        dates.append((tx_date.strftime("%Y-%m-%d"), tx_date.strftime("%B %Y")))
+
+    # One tuple per row, in CSV column order (no per-row dicts)
+    rows = []
+    total_revenue = 0
+    total_expenses = 0
+    for i, (category_type, category_name, amount, days_ago) in enumerate(
+        _draw_transactions(report_name, num_transactions)
+    ):
+        if category_type == "Revenue":
+            total_revenue += amount
+        else:
+            total_expenses += amount
+        date_str, month_str = dates[days_ago]
+        rows.append((
+            f"TXN-{i+1:05d}",
+            date_str,
+            category_type,
+            category_name,
+            f"{category_name} - {month_str}",
+            f"${amount:,.2f}",
+        ))
+
+    file_path = os.path.join(REPORTS_DIR, f"{result['file_name']}.gz")
+    tmp_path = f"{file_path}.{secrets.token_hex(4)}.tmp"
+
+    with gzip.open(tmp_path, "wt", newline="", compresslevel=1) as f:
+        # Write header info
+        f.write(f"# Financial Report: {report_name}\n")
+        f.write(f"# Generated: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"# Period: Last 30 Days\n")
+        f.write(f"# Total Transactions: {num_transactions}\n")
+        f.write(f"#\n")
+        f.write(f"# SUMMARY\n")
+        f.write(f"# Total Revenue: ${total_revenue:,.2f}\n")
+        f.write(f"# Total Expenses: ${total_expenses:,.2f}\n")
+        f.write(f"# Net Income: ${total_revenue - total_expenses:,.2f}\n")
+        f.write(f"#\n")
+
+        # Write transactions
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(rows)
+
+    os.replace(tmp_path, file_path)
+    return file_path